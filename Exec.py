@@ -1,5 +1,9 @@
 import sublime
+import sublime_plugin
+import codecs
 import os
+import threading
+import time
 
 from Default.exec import AsyncProcess
 
@@ -42,15 +46,18 @@ class ProcessListener(EventEmitter):
 #         exec_cmd('which node', listener=listener)
 #     """
 
-    def __init__(self):
+    def __init__(self, keep_data=True):
         EventEmitter.__init__(self)
         # super().__init__(self)
         self.data = b''
+        self.keep_data = keep_data
         self.finished = False
 
     def on_data(self, proc, data):
         self.emit('data', proc, data)
-        self.data += data
+
+        if self.keep_data:
+            self.data += data
 
         fn = getattr(self, 'handle_data', None)
 
@@ -67,6 +74,167 @@ class ProcessListener(EventEmitter):
             fn(proc)
 
 
+class OutputSink(object):
+    """
+    Streams the output of a process into a view or output panel. Decoded text is
+    buffered and appended at most once every `interval` milliseconds, so the amount
+    of append commands doesn't depend on how fast the process writes. The view is
+    capped at `max_size` characters by trimming its oldest content.
+
+    Example:
+        listener = ProcessListener()
+        sink = OutputSink.for_panel(window, 'build').attach(listener)
+
+        exec_cmd('make', listener=listener)
+
+    Attributes:
+        chunks (int): The amount of chunks written to the sink
+        flushes (int): The amount of times text was appended to the view
+        trimmed (int): The amount of characters dropped to respect max_size
+    """
+
+    def __init__(self, view, interval=50, max_size=200000, encoding='utf-8', scroll_to_end=True):
+        self.view = view
+        self.interval = interval
+        self.max_size = max_size
+        self.scroll_to_end = scroll_to_end
+        self.encoding = encoding
+        # AsyncProcess reads stdout and stderr on separate threads, each keeps its own decoder
+        self.decoders = {}
+        self.buffer = []
+        self.buffered = 0
+        self.scheduled = False
+        self.chunks = 0
+        self.flushes = 0
+        self.trimmed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_panel(cls, window, name, show=True, **kwargs):
+        """ Creates a sink writing to the output panel with the name passed """
+
+        view = window.create_output_panel(name)
+
+        if show:
+            window.run_command('show_panel', { 'panel': 'output.' + name })
+
+        return cls(view, **kwargs)
+
+    def attach(self, listener):
+        """ Subscribes to the data and finish events of a ProcessListener """
+
+        listener.on('data', self.on_data)
+        listener.on('finish', self.on_finish)
+
+        return self
+
+    def on_data(self, proc, data):
+        self.write(data)
+
+    def on_finish(self, proc, data=None):
+        self.write(b'', final=True)
+
+    def write(self, data, final=False):
+        """
+        Buffers bytes and schedules a flush if there isn't one pending. Bytes are
+        decoded per writing thread, final=True ends every thread's decoding.
+        """
+
+        with self._lock:
+            thread = threading.get_ident()
+
+            if thread not in self.decoders:
+                self.decoders[thread] = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+
+            text = self.decoders[thread].decode(data)
+
+            if final:
+                text += ''.join(decoder.decode(b'', True) for decoder in self.decoders.values())
+                self.decoders = {}
+
+            text = text.replace('\r\n', '\n')
+
+            if text:
+                self.chunks += 1
+                self.buffer.append(text)
+                self.buffered += len(text)
+
+            if self.max_size and self.buffered > self.max_size:
+                text = ''.join(self.buffer)
+                self.trimmed += len(text) - self.max_size
+                self.buffer = [text[-self.max_size:]]
+                self.buffered = self.max_size
+
+            if self.scheduled or not self.buffered:
+                return
+
+            self.scheduled = True
+
+        sublime.set_timeout(self.flush, self.interval)
+
+    def flush(self):
+        """ Appends all buffered text to the view and trims the view to max_size """
+
+        with self._lock:
+            text = ''.join(self.buffer)
+            self.buffer = []
+            self.buffered = 0
+            self.scheduled = False
+
+        if not text:
+            return
+
+        self.view.run_command('append', {
+            'characters': text,
+            'force': True,
+            'scroll_to_end': self.scroll_to_end,
+        })
+        self.flushes += 1
+
+        if self.max_size:
+            overflow = self.view.size() - self.max_size
+
+            if overflow > 0:
+                self.trimmed += overflow
+                self.view.run_command('sublime_tools_trim_view', { 'size': overflow })
+
+
+class SublimeToolsTrimViewCommand(sublime_plugin.TextCommand):
+    """ Erases the first `size` characters of a view, regardless of it being read only """
+
+    def run(self, edit, size=0):
+        read_only = self.view.is_read_only()
+        self.view.set_read_only(False)
+        self.view.erase(edit, sublime.Region(0, size))
+        self.view.set_read_only(read_only)
+
+
+def create_listener(listener=None, on_finish=None, on_data=None):
+    """
+    Returns the listener passed, or creates a ProcessListener bound to the on_finish
+    and on_data callbacks.
+
+    Raises:
+        Exception if neither a listener nor one of the callbacks are passed
+    """
+
+    if listener is not None:
+        return listener
+
+    listener = ProcessListener()
+
+    if callable(on_finish):
+        listener.on('finish', on_finish)
+
+    if callable(on_data):
+        listener.on('data', on_data)
+
+    if not callable(on_finish) and not callable(on_data):
+        raise Exception('Either a process listener or on_finish/on_data callbacks must be passed')
+
+    return listener
+
+
 def exec_cmd(
         command,
         listener=None,
@@ -133,17 +301,7 @@ def exec_cmd(
         exec_cmd(['node', filename], listener=listener, working_dir=dirname)
     """
 
-    if listener is None:
-        listener = ProcessListener()
-
-        if callable(on_finish):
-            listener.on('finish', on_finish)
-
-        if callable(on_data):
-            listener.on('data', on_data)
-
-        if not callable(on_finish) and not callable(on_data):
-            raise Exception('Either a process listener or on_finish/on_data callbacks must be passed')
+    listener = create_listener(listener, on_finish=on_finish, on_data=on_data)
 
     if working_dir != '':
         os.chdir(working_dir)
@@ -206,3 +364,231 @@ def execjsfile(absfilename, args=[], node_path=None, **kwargs):
     cmd = ['node' if node_path is None else node_path, absfilename] + args
 
     return exec_cmd(cmd, **kwargs)
+
+
+class JobMetrics(object):
+    """
+    Counters describing the work thrown away by superseded keyed runs.
+
+    Attributes:
+        started (int): The amount of runs started
+        finished (int): The amount of runs that finished without being superseded
+        wasted_runs (int): The amount of runs superseded by a newer run for the same key
+        kills (int): The amount of superseded runs that were still alive and had to be killed
+        kill_latency_total (float): Seconds between killing a child and it exiting, summed
+        kill_latency_max (float): The longest time in seconds a killed child took to exit
+        dropped_events (int): The amount of data/finish events dropped from superseded runs
+        dropped_bytes (int): The amount of output bytes dropped from superseded runs
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = 0
+            self.finished = 0
+            self.wasted_runs = 0
+            self.kills = 0
+            self.kill_latency_total = 0.0
+            self.kill_latency_max = 0.0
+            self.dropped_events = 0
+            self.dropped_bytes = 0
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def add_kill_latency(self, seconds):
+        with self._lock:
+            self.kill_latency_total += seconds
+            self.kill_latency_max = max(self.kill_latency_max, seconds)
+
+    def to_json(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'finished': self.finished,
+                'wasted_runs': self.wasted_runs,
+                'kills': self.kills,
+                'kill_latency_avg': self.kill_latency_total / self.kills if self.kills else 0.0,
+                'kill_latency_max': self.kill_latency_max,
+                'dropped_events': self.dropped_events,
+                'dropped_bytes': self.dropped_bytes,
+            }
+
+
+class KeyedListener(object):
+    """
+    Wraps the listener of a keyed run and stops forwarding its events once the run
+    has been superseded by a newer run for the same key.
+    """
+
+    def __init__(self, jobs, key, listener):
+        self.jobs = jobs
+        self.key = key
+        self.listener = listener
+        self.proc = None
+        self.superseded = False
+
+    def on_data(self, proc, data):
+        if self.superseded:
+            self.jobs.metrics.incr('dropped_events')
+            self.jobs.metrics.incr('dropped_bytes', len(data))
+            return
+
+        self.listener.on_data(proc, data)
+
+    def on_finished(self, proc):
+        if self.superseded:
+            self.jobs.metrics.incr('dropped_events')
+            return
+
+        self.jobs.release(self)
+        self.listener.on_finished(proc)
+
+
+class JobManager(object):
+    """
+    Runs commands keyed by an arbitrary hashable, e.g. (view.id(), 'eslint'). Starting
+    a run for a key that already has a run in flight kills the older child and drops
+    any of its output that is still on its way, so only the latest run reports back.
+
+    Example:
+        jobs = JobManager()
+
+        def on_finish(proc, data):
+            print(data)
+
+        jobs.run((view.id(), 'eslint'), ['eslint', '--stdin'], on_finish=on_finish)
+        # The first run is killed, only this run calls on_finish
+        jobs.run((view.id(), 'eslint'), ['eslint', '--stdin'], on_finish=on_finish)
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.metrics = JobMetrics()
+        self._lock = threading.Lock()
+
+    def run(self, key, command, listener=None, on_finish=None, on_data=None, **kwargs):
+        """
+        Executes a command for a key, superseding the run currently in flight for
+        that key. Refer to exec_cmd for the other options.
+
+        Args:
+            key (hashable): Identifies the runs that supersede one another
+
+        Returns:
+            AsyncProcess
+        """
+
+        job = KeyedListener(self, key, create_listener(listener, on_finish=on_finish, on_data=on_data))
+
+        with self._lock:
+            previous = self.jobs.get(key)
+            self.jobs[key] = job
+
+        if previous is not None:
+            self.supersede(previous)
+
+        try:
+            proc = exec_cmd(command, listener=job, **kwargs)
+        except Exception:
+            # Don't leave the key pointing at a run that never started
+            with self._lock:
+                if self.jobs.get(key) is job:
+                    del self.jobs[key]
+
+            raise
+
+        job.proc = proc
+        self.metrics.incr('started')
+
+        # Superseded before the child was assigned, e.g. by a run on another thread
+        if job.superseded:
+            self.kill(proc)
+
+        return proc
+
+    def cancel(self, key):
+        """ Kills the run in flight for a key, returns True if there was one """
+
+        with self._lock:
+            job = self.jobs.pop(key, None)
+
+        if job is None:
+            return False
+
+        self.supersede(job)
+
+        return True
+
+    def cancel_all(self):
+        for key in list(self.jobs.keys()):
+            self.cancel(key)
+
+    def is_current(self, key, proc):
+        """ Returns true if proc belongs to the latest run for the key """
+        job = self.jobs.get(key)
+
+        return job is not None and job.proc is proc
+
+    def release(self, job):
+        """ Forgets a job that finished on its own """
+
+        with self._lock:
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+
+        self.metrics.incr('finished')
+
+    def supersede(self, job):
+        job.superseded = True
+        self.metrics.incr('wasted_runs')
+
+        if job.proc is not None:
+            self.kill(job.proc)
+
+    def kill(self, proc):
+        """ Kills a child that is still alive and records how long it takes to exit """
+
+        if not proc.poll():
+            return
+
+        killed_at = time.time()
+        proc.kill()
+        self.metrics.incr('kills')
+
+        def wait():
+            proc.proc.wait()
+            self.metrics.add_kill_latency(time.time() - killed_at)
+
+        threading.Thread(target=wait, daemon=True).start()
+
+
+_JOBS = None
+
+def _jobs():
+    global _JOBS
+    if _JOBS is None:
+        _JOBS = JobManager()
+    return _JOBS
+
+
+def exec_keyed(key, command, **kwargs):
+    """
+    Executes a command with the shared JobManager, killing the run in flight for the
+    same key. Refer to JobManager.run for more options.
+
+    Example:
+        exec_keyed((view.id(), 'eslint'), ['eslint', view.file_name()], on_finish=on_finish)
+    """
+
+    return _jobs().run(key, command, **kwargs)
+
+
+def job_metrics():
+    """ Returns the metrics of the shared JobManager as a dict """
+
+    return _jobs().metrics.to_json()
@@ -1,3 +1,17 @@
+import collections
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import queue
+import re
+import threading
+import time
+
+import sublime_plugin
 
 DEBUG = 1 << 1
 INFO = 1 << 2
@@ -6,31 +20,578 @@ ERROR = 1 << 4
 CRITICAL = 1 << 5
 DEFAULT_LEVELS = int('11111', 2)
 
+class ConsoleSink(object):
+    """ Prints lines to the console """
+
+    def write(self, lines):
+        for line in lines:
+            print(line)
+
+    def flush(self):
+        pass
+
+
+class RingBufferSink(object):
+    """
+    Keeps the last `size` lines in memory, to be dumped on demand.
+    """
+
+    def __init__(self, size=1000):
+        self.lines = collections.deque(maxlen=size)
+
+    def write(self, lines):
+        self.lines.extend(lines)
+
+    def flush(self):
+        pass
+
+    def dump(self, clear=False):
+        """ Returns the lines held, oldest first """
+        lines = list(self.lines)
+
+        if clear:
+            self.lines.clear()
+
+        return lines
+
+
+class RotatingFileSink(object):
+    """
+    Appends lines to a file through a write buffer. Once the file grows past
+    `max_bytes` it is renamed to path.1, shifting older files up to path.<backups>.
+    """
+
+    def __init__(self, path, max_bytes=1024 * 1024, backups=3, buffering=64 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffering = buffering
+        self.file = None
+        self.size = 0
+
+    def open(self):
+        self.file = open(self.path, 'a', buffering=self.buffering, encoding='utf-8')
+        self.size = self.file.tell()
+
+    def write(self, lines):
+        if self.file is None:
+            self.open()
+
+        text = '\n'.join(lines) + '\n'
+        self.file.write(text)
+        self.size += len(text.encode('utf-8'))
+
+        if self.size >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        self.close()
+
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists('{}.{}'.format(self.path, i)):
+                os.replace('{}.{}'.format(self.path, i), '{}.{}'.format(self.path, i + 1))
+
+        if self.backups > 0:
+            os.replace(self.path, self.path + '.1')
+        else:
+            os.remove(self.path)
+
+        self.open()
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class AsyncSink(object):
+    """
+    Hands lines to other sinks from a background thread, in batches of up to
+    `batch_size` lines. Writing never blocks: when `max_size` lines are already
+    waiting, new lines are dropped and counted.
+
+    Example:
+        ring = RingBufferSink()
+        logger = Logger('PackageName', sinks=[AsyncSink([ConsoleSink(), ring])])
+
+        print(ring.dump())
+
+    Attributes:
+        dropped (int): The amount of lines dropped because the queue was full
+    """
+
+    def __init__(self, sinks, max_size=10000, batch_size=256):
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.queue = queue.Queue(max_size)
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def write(self, lines):
+        if self.thread is None:
+            self.start()
+
+        for line in lines:
+            try:
+                self.queue.put_nowait(line)
+            except queue.Full:
+                self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for sink in self.sinks:
+                try:
+                    sink.write(batch)
+                except Exception as e:
+                    print('SublimeTools: log sink failed', e)
+
+            for line in batch:
+                self.queue.task_done()
+
+    def flush(self):
+        """ Blocks until every line queued has been written, then flushes the sinks """
+
+        self.queue.join()
+
+        for sink in self.sinks:
+            sink.flush()
+
+
+class SpanStats(object):
+    """
+    Aggregates the durations recorded for a span name. Percentiles are computed from
+    the last `sample_size` durations.
+    """
+
+    def __init__(self, sample_size=1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = collections.deque(maxlen=sample_size)
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.samples.append(duration)
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+
+        samples = sorted(self.samples)
+
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'max': self.max,
+        }
+
+
+class Spans(object):
+    """
+    Records the durations of named spans of code, using a monotonic clock.
+
+    A span can also be profiled with cProfile every `every` times it runs, keeping
+    the last profile of each name in `profiles`.
+
+    Example:
+        with spans.span('lint.render'):
+            render(view)
+
+        @spans.timed('lint.parse')
+        def parse(output):
+            ...
+
+        spans.profile('lint.render', every=100)
+
+        print(spans.table())
+    """
+
+    def __init__(self, sample_size=1000):
+        self.sample_size = sample_size
+        self.stats = {}
+        self.sampling = {}
+        self.profiles = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, duration):
+        with self.lock:
+            if name not in self.stats:
+                self.stats[name] = SpanStats(self.sample_size)
+
+            self.stats[name].add(duration)
+
+    def profile(self, name, every=1):
+        """ Profiles one in `every` runs of the span, or stops profiling it if every is 0 """
+
+        if every:
+            self.sampling[name] = [every, 0]
+        else:
+            self.sampling.pop(name, None)
+
+    def should_profile(self, name):
+        sampling = self.sampling.get(name)
+
+        if sampling is None:
+            return False
+
+        sampling[1] += 1
+
+        return sampling[1] % sampling[0] == 0
+
+    @contextlib.contextmanager
+    def span(self, name):
+        profiler = None
+
+        if self.sampling and self.should_profile(name):
+            profiler = cProfile.Profile()
+
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is already active
+                profiler = None
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+            if profiler is not None:
+                profiler.disable()
+                stream = io.StringIO()
+                pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(30)
+                self.profiles[name] = stream.getvalue()
+
+    def timed(self, name=None):
+        """ Decorates a function to record each call as a span, named after the function by default """
+
+        def decorator(fn):
+            span_name = name or fn.__module__ + '.' + fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def report(self):
+        """ Returns the aggregates of every span name, durations are in seconds """
+
+        with self.lock:
+            return { name: stats.to_dict() for name, stats in self.stats.items() }
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=2, sort_keys=True)
+
+    def table(self):
+        """ Returns the aggregates as a text table, durations are in milliseconds """
+
+        columns = ('count', 'total', 'p50', 'p95', 'max')
+        report = self.report()
+        width = max([len('span')] + [len(name) for name in report])
+        lines = ['{:<{}}'.format('span', width) + ''.join('{:>12}'.format(column) for column in columns)]
+
+        for name in sorted(report, key=lambda name: -report[name]['total']):
+            stats = report[name]
+            lines.append('{:<{}}{:>12}'.format(name, width, stats['count']) + ''.join(
+                '{:>12.3f}'.format(stats[column] * 1000) for column in columns[1:]
+            ))
+
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+            self.profiles = {}
+
+
+spans = Spans()
+
+
+class RateLimiter(object):
+    """
+    Limits how often messages with the same key are logged. Each key may be logged
+    `limit` times per `period` seconds, further messages are suppressed and counted.
+    The count is reported as "last message repeated N times" once the key is logged
+    again in a later period, when it's evicted from the `max_keys` most recent keys,
+    or when the logger is flushed.
+
+    A Logger keys messages by level and arguments before formatting them, so suppressed
+    messages are never formatted. Deferred arguments are keyed by their code rather
+    than called, and reports show the last message that was logged for the key.
+
+    Example:
+        logger = Logger('PackageName', rate_limit=RateLimiter(limit=5, period=1))
+
+    Attributes:
+        suppressed (int): The total amount of lines suppressed
+    """
+
+    def __init__(self, limit=10, period=1.0, max_keys=1000, clock=time.monotonic):
+        self.limit = limit
+        self.period = period
+        self.max_keys = max_keys
+        self.clock = clock
+        self.recent = collections.OrderedDict()
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def check(self, key):
+        """
+        Returns:
+            tuple of whether the message should be logged, and a list of (message, count)
+            for the keys whose suppressed messages should now be reported
+        """
+
+        with self.lock:
+            now = self.clock()
+            entry = self.recent.get(key)
+            reports = []
+
+            if entry is None or now - entry[0] >= self.period:
+                if entry is not None and entry[2]:
+                    reports.append((entry[3], entry[2]))
+
+                self.recent[key] = [now, 1, 0, key if entry is None else entry[3]]
+                self.recent.move_to_end(key)
+
+                while len(self.recent) > self.max_keys:
+                    _, (_, _, count, message) = self.recent.popitem(last=False)
+
+                    if count:
+                        reports.append((message, count))
+
+                return True, reports
+
+            self.recent.move_to_end(key)
+
+            if entry[1] < self.limit:
+                entry[1] += 1
+                return True, reports
+
+            entry[2] += 1
+            self.suppressed += 1
+
+            return False, reports
+
+    def drain(self):
+        """ Returns and resets the (message, count) of every key with suppressed messages """
+
+        with self.lock:
+            reports = []
+
+            for entry in self.recent.values():
+                if entry[2]:
+                    reports.append((entry[3], entry[2]))
+                    entry[2] = 0
+
+            return reports
+
+    def remember(self, key, message):
+        """ Sets the message reported for the suppressed messages of a key """
+
+        with self.lock:
+            entry = self.recent.get(key)
+
+            if entry is not None:
+                entry[3] = message
+
+
 class Logger(object):
     """
     TODO: Figure out why the default logger doesn't work as expected
+
+    Lines are written to each of the sinks passed, which default to the console.
+
+    Arguments are only formatted when the level is enabled: callables are called
+    for their value, and a first argument containing "%" is formatted with the rest
+    of the arguments. The methods of disabled levels are replaced on the instance by
+    a no-op, so a disabled call costs about one attribute lookup.
+
+    Example:
+        logger = Logger('PackageName', level='WARNING, ERROR, CRITICAL')
+
+        logger.debug('state %s', lambda: json.dumps(state))  # Nothing is formatted
+
+    Repeated lines can be rate limited by passing a RateLimiter as `rate_limit`.
     """
 
-    def __init__(self, name="", level=DEFAULT_LEVELS):
-        self.level = level
+    def __init__(self, name="", level=DEFAULT_LEVELS, sinks=None, rate_limit=None):
         self.name = name
+        self.sinks = sinks if sinks is not None else [ConsoleSink()]
+        self.rate_limit = rate_limit
+        self.set_level(level)
+
+    def to_level(self, level_names):
+        """
+        Converts level names to a mask.
+
+        Args:
+            level_names (str|list): Names separated by commas, pipes or whitespace,
+                e.g. "DEBUG|INFO", or a list of names
+
+        Returns:
+            int
+        """
+
+        if isinstance(level_names, str):
+            level_names = re.split(r'[\s,|]+', level_names.strip())
 
-    def to_level(self, level_names: str):
         mask = 0
 
-        for level_name in levels:
-            if level in levels_by_name[level_name]:
-                mask |= levels_by_name[level_name]
+        for level_name in level_names:
+            if not level_name:
+                continue
+
+            if level_name.upper() in levels_by_name:
+                mask |= levels_by_name[level_name.upper()]
             else:
                 raise Exception('Invalid level name ' + str(level_name))
 
         return mask
 
     def set_level(self, level):
+        """
+        Args:
+            level (int|str|list): A mask or level names, as taken by to_level
+        """
+
+        if not isinstance(level, int):
+            level = self.to_level(level)
+
         self.level = level
 
+        for level_name, mask in levels_by_name.items():
+            method = level_name.lower()
+
+            if level & mask:
+                self.__dict__.pop(method, None)
+            else:
+                setattr(self, method, self._disabled)
+
+    def is_enabled(self, level):
+        return self.level & level != 0
+
+    @staticmethod
+    def _disabled(*args):
+        pass
+
+    def span(self, name):
+        """
+        Times a block of code under the logger's name.
+
+        Example:
+            with logger.span('render'):
+                render(view)
+        """
+
+        return spans.span(self.name + '.' + name)
+
+    def timed(self, name=None):
+        """ Decorates a function to time its calls under the logger's name """
+
+        def decorator(fn):
+            return spans.timed(self.name + '.' + (name or fn.__qualname__))(fn)
+
+        return decorator
+
+    def format(self, args):
+        """ Renders the arguments of a log call to a message """
+
+        args = [arg() if callable(arg) and not isinstance(arg, type) else arg for arg in args]
+
+        if len(args) > 1 and isinstance(args[0], str) and '%' in args[0]:
+            try:
+                return args[0] % tuple(args[1:])
+            except (TypeError, ValueError):
+                pass
+
+        return ' '.join(str(arg) for arg in args)
+
     def _log(self, args, level_name=''):
-        print('{}:{}'.format(self.name, level_name), *args)
+        lines = []
+        allowed = True
+
+        if self.rate_limit is not None:
+            key = self.rate_key(args, level_name)
+            allowed, reports = self.rate_limit.check(key)
+            lines = self.repeated(reports)
+
+        if allowed:
+            line = '{}:{} {}'.format(self.name, level_name, self.format(args))
+            lines.append(line)
+
+            if self.rate_limit is not None:
+                self.rate_limit.remember(key, line)
+
+        if not lines:
+            return
+
+        for sink in self.sinks:
+            sink.write(lines)
+
+    def rate_key(self, args, level_name):
+        """
+        Returns the key a message is rate limited by, without formatting it. Deferred
+        arguments are keyed by their code, so they aren't called.
+        """
+
+        key = [level_name]
+
+        for arg in args:
+            if isinstance(arg, str):
+                key.append(arg)
+            elif callable(arg) and not isinstance(arg, type):
+                key.append(getattr(arg, '__code__', None) or type(arg).__name__)
+            else:
+                key.append(repr(arg))
+
+        return tuple(key)
+
+    def repeated(self, reports):
+        return ['{} [last message repeated {} times]'.format(line, count) for line, count in reports]
+
+    def flush(self):
+        if self.rate_limit is not None:
+            lines = self.repeated(self.rate_limit.drain())
+
+            if lines:
+                for sink in self.sinks:
+                    sink.write(lines)
+
+        for sink in self.sinks:
+            sink.flush()
 
     def debug(self, *args):
         if self.level & DEBUG != 0:
@@ -60,3 +621,23 @@ levels_by_name = {
     'ERROR': ERROR,
     'CRITICAL': CRITICAL,
 }
+
+
+class SublimeToolsDumpSpansCommand(sublime_plugin.WindowCommand):
+    """
+    Shows the aggregated span timings in a new view, as a table followed by the
+    profiles captured, or as JSON.
+    """
+
+    def run(self, format='table'):
+        if format == 'json':
+            text = spans.to_json()
+        else:
+            text = '\n\n'.join([spans.table()] + [
+                '{}\n{}'.format(name, profile) for name, profile in sorted(spans.profiles.items())
+            ])
+
+        view = self.window.new_file()
+        view.set_scratch(True)
+        view.set_name('Spans')
+        view.run_command('append', { 'characters': text })
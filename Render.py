@@ -0,0 +1,311 @@
+import time
+
+import sublime
+
+from .View import get_line_index, is_length, locations_to_points, LineIndex, LocationRow, RenderLocation
+
+
+def location_signature(location):
+    """
+    Returns a tuple describing a raw location dict, RenderLocation or LocationRow, used
+    to compare locations without converting them to regions. Missing values are -1,
+    like in a LocationTable.
+    """
+
+    if isinstance(location, LocationRow):
+        table = location.table
+        row = location.row
+
+        return (
+            table.begins[row], table.ends[row],
+            table.start_lines[row], table.start_columns[row],
+            table.end_lines[row], table.end_columns[row],
+        )
+    elif isinstance(location, dict):
+        location = RenderLocation(**location)
+    elif not isinstance(location, RenderLocation):
+        raise Exception('Expected a location dict, RenderLocation or LocationRow, got ' + str(location))
+
+    return tuple(value if is_length(value) else -1 for value in location.key())
+
+
+def to_regions(view, locations):
+    """
+    Converts raw location dicts or location objects to regions, skipping the ones
+    that can't be rendered.
+
+    Args:
+        view (sublime.View|LineIndex):
+        locations (list):
+
+    Returns:
+        list of sublime.Region
+    """
+
+    if all(isinstance(location, dict) for location in locations):
+        begins, ends, _ = locations_to_points(view, locations)
+
+        return list(map(sublime.Region, begins, ends))
+
+    index = view if isinstance(view, LineIndex) else get_line_index(view)
+    regions = (location.to_region(index) for location in locations)
+
+    return [region for region in regions if region is not None]
+
+
+class DiffRenderer(object):
+    """
+    Renders groups of locations under region keys, remembering what was last rendered
+    for each view and key. Only the keys whose locations, scope, icon or flags changed
+    are added again, and keys that are no longer rendered are erased, so rendering the
+    same results twice doesn't call into the view at all.
+
+    Example:
+        renderer = DiffRenderer()
+
+        renderer.render(view, {
+            'lint.errors': { 'locations': errors, 'scope': 'invalid' },
+            'lint.warnings': { 'locations': warnings, 'scope': 'comment', 'flags': sublime.DRAW_NO_FILL },
+        })
+
+    Attributes:
+        api_calls (int): The amount of add_regions and erase_regions calls made
+    """
+
+    def __init__(self):
+        self.rendered = {}
+        self.api_calls = 0
+
+    def render(self, view, groups):
+        """
+        Args:
+            view (sublime.View): The view to render to
+            groups (dict): Maps a region key to a dict with locations, and optionally
+                scope, icon and flags as taken by view.add_regions
+        """
+
+        previous = self.rendered.get(view.id(), {})
+        current = {}
+
+        for key, group in groups.items():
+            locations = group.get('locations', [])
+            state = (
+                tuple(location_signature(location) for location in locations),
+                group.get('scope', ''),
+                group.get('icon', ''),
+                group.get('flags', 0),
+            )
+            current[key] = state
+
+            if previous.get(key) == state:
+                continue
+
+            view.add_regions(key, to_regions(view, locations), *state[1:])
+            self.api_calls += 1
+
+        for key in previous:
+            if key not in current:
+                view.erase_regions(key)
+                self.api_calls += 1
+
+        self.rendered[view.id()] = current
+
+    def clear(self, view):
+        """ Erases every key rendered to the view """
+
+        for key in self.rendered.pop(view.id(), {}):
+            view.erase_regions(key)
+            self.api_calls += 1
+
+    def forget(self, view_id):
+        """ Drops what was rendered to a view, e.g. when it's closed """
+
+        self.rendered.pop(view_id, None)
+
+
+class LazyRenderer(object):
+    """
+    Renders a large list of raw locations (the dicts RenderLocation takes) visible
+    region first. The locations that begin in the visible region are converted and
+    painted right away, the rest are painted in chunks that each use at most `budget`
+    milliseconds of the main thread. With background=False the rest are only painted
+    as they scroll into view, whenever update() is called.
+
+    Every chunk is added under its own region key, prefixed by `key`.
+
+    Example:
+        renderer = LazyRenderer(view, 'lint', scope='invalid', flags=sublime.DRAW_NO_FILL)
+        renderer.render(results)
+
+    Attributes:
+        total (int): The amount of locations passed to render
+        painted (int): The amount of regions painted so far
+        skipped (int): The amount of locations that could not be rendered
+        first_paint (float): Seconds from render until the visible region was painted
+        elapsed (float): Seconds from render until every location was painted
+    """
+
+    def __init__(self, view, key, scope='', icon='', flags=0, chunk_size=1000, budget=8, background=True):
+        self.view = view
+        self.key = key
+        self.scope = scope
+        self.icon = icon
+        self.flags = flags
+        self.chunk_size = chunk_size
+        self.budget = budget
+        self.background = background
+        self.keys = []
+        self.pending = []
+        self.generation = 0
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        self.total = 0
+        self.painted = 0
+        self.skipped = 0
+        self.started_at = None
+        self.first_paint = None
+        self.elapsed = None
+
+    def progress(self):
+        """ Returns the fraction of the locations that have been processed, from 0 to 1 """
+
+        if not self.total:
+            return 1.0
+
+        return (self.total - len(self.pending)) / self.total
+
+    def metrics(self):
+        return {
+            'total': self.total,
+            'painted': self.painted,
+            'skipped': self.skipped,
+            'pending': len(self.pending),
+            'progress': self.progress(),
+            'first_paint': self.first_paint,
+            'elapsed': self.elapsed,
+        }
+
+    def clear(self):
+        """ Erases all of the regions painted and stops painting the pending locations """
+
+        self.generation += 1
+        self.pending = []
+
+        for key in self.keys:
+            self.view.erase_regions(key)
+
+        self.keys = []
+
+    def render(self, locations):
+        """ Replaces the regions painted with the locations passed """
+
+        self.clear()
+        self.reset_metrics()
+        self.started_at = time.time()
+        self.total = len(locations)
+        self.pending = list(locations)
+
+        self.paint(self.take_visible())
+        self.first_paint = time.time() - self.started_at
+
+        if self.background:
+            self.schedule()
+        else:
+            self.check_done()
+
+    def update(self):
+        """ Paints the pending locations that are now in the visible region """
+
+        if self.pending:
+            self.paint(self.take_visible())
+            self.check_done()
+
+    def take_visible(self):
+        """
+        Removes and returns the pending locations beginning in the visible region,
+        judged by their position or else their starting line.
+        """
+
+        visible = self.view.visible_region()
+        index = get_line_index(self.view)
+        first_line = index.rowcol(visible.begin())[0]
+        last_line = index.rowcol(visible.end())[0]
+        begin = visible.begin()
+        end = visible.end()
+
+        taken = []
+        pending = []
+
+        for location in self.pending:
+            point = line = None
+
+            if isinstance(location, dict):
+                position = location.get('position')
+                start = location.get('start')
+                point = position.get('start') if isinstance(position, dict) else None
+                line = start.get('line') if isinstance(start, dict) else None
+
+            if isinstance(point, int) and point >= 0:
+                is_visible = begin <= point <= end
+            elif isinstance(line, int) and line >= 0:
+                is_visible = first_line <= line <= last_line
+            else:
+                # Can't be rendered, let paint count it as skipped
+                is_visible = True
+
+            (taken if is_visible else pending).append(location)
+
+        self.pending = pending
+
+        return taken
+
+    def paint(self, locations):
+        if not locations:
+            return
+
+        begins, ends, _ = locations_to_points(self.view, locations)
+        self.skipped += len(locations) - len(begins)
+        self.add_regions(list(map(sublime.Region, begins, ends)))
+
+    def add_regions(self, regions):
+        if not regions:
+            return
+
+        key = '{}.{}'.format(self.key, len(self.keys))
+
+        self.view.add_regions(key, regions, self.scope, self.icon, self.flags)
+        self.keys.append(key)
+        self.painted += len(regions)
+
+    def schedule(self):
+        generation = self.generation
+        sublime.set_timeout(lambda: self.tick(generation), 0)
+
+    def tick(self, generation):
+        """ Paints chunks of the pending locations until the time budget is spent """
+
+        if generation != self.generation:
+            return
+
+        deadline = time.time() + self.budget / 1000
+        regions = []
+
+        while self.pending and time.time() < deadline:
+            chunk = self.pending[:self.chunk_size]
+            del self.pending[:self.chunk_size]
+
+            begins, ends, _ = locations_to_points(self.view, chunk)
+            self.skipped += len(chunk) - len(begins)
+            regions.extend(map(sublime.Region, begins, ends))
+
+        self.add_regions(regions)
+
+        if self.pending:
+            self.schedule()
+        else:
+            self.check_done()
+
+    def check_done(self):
+        if not self.pending and self.elapsed is None:
+            self.elapsed = time.time() - self.started_at
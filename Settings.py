@@ -1,49 +1,559 @@
+import contextlib
+import copy
+import itertools
+import threading
+import weakref
+
 import sublime
+import sublime_plugin
+
+from .EventEmitter import EventEmitter
+
+
+MISSING = object()
+
+# Longest save_delay allowed, bounding what can be lost if sublime exits without on_exit
+MAX_SAVE_DELAY = 2000
 
-class Settings(object):
+_tags = itertools.count()
+
+
+class Settings(EventEmitter):
     """
     A wrapper for a sublime.Settings object. This class will automatically reload
     the underlying settings object, creating a sort of live binding to what is
     actually defined in the settings in that moment in time.
 
+    Values are read from the settings object once and kept in a snapshot. When the
+    settings change, the keys in the snapshot are read again and a "change.<key>"
+    event is emitted, with the new and old values, for each key whose value changed.
+    A "change" event is then emitted with the list of keys that changed.
+
+    With lazy=True, the settings are only loaded when they are first used, which
+    keeps creating Settings objects at import time cheap. With preload=True, they
+    are loaded on the async thread instead.
+
+    Sets can be written to disk with a single save, either by making them within
+    batch(), or by passing save_delay, which saves once no set was made for that
+    many milliseconds, at most MAX_SAVE_DELAY. Pending saves are flushed when
+    SublimeTools unloads and, on ST4, when sublime exits. ST3 has no exit event, so
+    sets made within save_delay of quitting can be lost there.
+
+    The settings object doesn't keep the instance alive, its change callback is
+    removed once the instance is garbage collected, or right away by close().
+
     Example:
     user_settings = Settings('PackageName.sublime-settings')
     user.settings.get('node_path')
+
+    @user_settings.watch('node_path')
+    def on_node_path(value, previous):
+        print(value)
     """
 
     loaded_settings = None
 
-    def __init__(self, path, load=True):
+    def __init__(self, path, load=True, save_delay=None, lazy=False, preload=False):
+        EventEmitter.__init__(self)
         self.path = path
+        # clear_on_change removes every callback under a tag, so each instance needs its own
+        self.tag = '{}.{}'.format(path, next(_tags))
+        self.load_lock = threading.Lock()
+        self.snapshot = {}
+        self.hits = 0
+        self.misses = 0
+        self.save_delay = None if save_delay is None else min(save_delay, MAX_SAVE_DELAY)
+        self.save_generation = 0
+        self.batching = 0
+        self.dirty = False
+        self.saves = 0
 
-        if load:
+        if preload:
+            self.preload()
+        elif load and not lazy:
             self.load()
 
     def load(self):
-        self.loaded_settings = sublime.load_settings(self.path)
-        self.loaded_settings.clear_on_change(self.path)
-        self.loaded_settings.add_on_change(self.path, self.load)
+        settings = sublime.load_settings(self.path)
+        self.snapshot = {}
+        settings.clear_on_change(self.tag)
+        settings.add_on_change(self.tag, weak_on_change(self, settings))
+        self.loaded_settings = settings
+
+    def close(self):
+        """ Stops following changes to the settings, saving them if a save is pending """
+
+        self.flush()
+
+        if self.loaded_settings is not None:
+            self.loaded_settings.clear_on_change(self.tag)
+
+    def ensure_loaded(self):
+        """ Loads the settings if they haven't been loaded yet, returns the sublime.Settings """
+
+        if self.loaded_settings is None:
+            with self.load_lock:
+                if self.loaded_settings is None:
+                    self.load()
+
+        return self.loaded_settings
+
+    def preload(self):
+        """ Loads the settings on the async thread, unless something uses them first """
+        sublime.set_timeout_async(self.ensure_loaded, 0)
+
+    def on_change(self):
+        """ Reads the keys in the snapshot again and emits events for the keys that changed """
+
+        previous = self.snapshot
+        self.snapshot = {}
+        changed = [key for key, value in previous.items() if self.read(key) != value]
+
+        for key in changed:
+            self.emit_change(key, previous[key])
+
+        if changed:
+            self.emit('change', changed)
+
+    def emit_change(self, key, previous):
+        value = self.snapshot.get(key, MISSING)
+
+        self.emit(
+            'change.' + key,
+            None if value is MISSING else copy.deepcopy(value),
+            None if previous is MISSING else previous,
+        )
+
+    def watch(self, key, func=None):
+        """
+        Registers a function to the change.<key> event, reading the key so its changes
+        are noticed. When func is None, decorator usage is assumed. Returns the function.
+        """
+
+        def _watch(func):
+            self.read(key)
+
+            return self.on('change.' + key, func)
+
+        if func is not None:
+            return _watch(func)
+        else:
+            return _watch
 
     def save(self):
+        """ Writes the settings to disk, cancelling a scheduled save """
+
+        self.save_generation += 1
+        self.dirty = False
+        pending_saves.discard(self)
+
         sublime.save_settings(self.path)
+        self.saves += 1
+
+    def schedule_save(self, delay=None):
+        """
+        Saves the settings once `delay` milliseconds pass without another save being
+        scheduled, so a burst of sets is written to disk once.
+        """
+
+        self.save_generation += 1
+        generation = self.save_generation
+        pending_saves.add(self)
+
+        def save():
+            if generation == self.save_generation:
+                self.save()
+
+        sublime.set_timeout(save, min(self.save_delay if delay is None else delay, MAX_SAVE_DELAY))
+
+    def flush(self):
+        """ Saves the settings now if there are unsaved changes """
+
+        if self.dirty:
+            self.save()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Groups the sets made within it into a single save when it exits, or a single
+        scheduled save when save_delay is set.
+
+        Example:
+            with settings.batch():
+                settings.set('a', 1)
+                settings.set('b', 2)
+        """
+
+        self.batching += 1
+
+        try:
+            yield self
+        finally:
+            self.batching -= 1
+
+            if not self.batching and self.dirty:
+                if self.save_delay is None:
+                    self.save()
+                else:
+                    self.schedule_save()
+
+    def read(self, key):
+        """
+        Returns the value of a key from the snapshot, reading it from the settings object
+        if it isn't in the snapshot yet. Returns MISSING if the key doesn't exist. The
+        value returned is the one held in the snapshot and must not be modified.
+        """
+
+        if key in self.snapshot:
+            self.hits += 1
+            return self.snapshot[key]
+
+        self.misses += 1
+        settings = self.ensure_loaded()
+        value = settings.get(key) if settings.has(key) else MISSING
+        self.snapshot[key] = value
+
+        return value
 
     def set(self, key, value):
         """ Set a value into the sublime.Settings object """
-        self.loaded_settings.set(key, value)
+        tracked = key in self.snapshot
+        previous = self.snapshot.get(key, MISSING)
+
+        settings = self.ensure_loaded()
+
+        # Update the snapshot first, so on_change finds no difference whether sublime
+        # calls it from within settings.set or later, and the change is emitted once
+        self.snapshot[key] = copy.deepcopy(value)
+        settings.set(key, value)
+
+        if tracked and previous != value:
+            self.emit_change(key, previous)
+            self.emit('change', [key])
+
+        self.dirty = True
+
+        if not self.batching and self.save_delay is not None:
+            self.schedule_save()
 
     def get(self, key, default=None):
         """ Get a value by key from the settings. Loads from default settings if key doesn't the exist. """
-        return self.loaded_settings.get(key, default)
+        value = self.read(key)
+
+        if value is MISSING:
+            return default
+
+        # Hand out copies, the same as sublime.Settings does
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+    def get_path(self, path, default=None):
+        """
+        Returns the value at a nested path, e.g. "linters.eslint.args.0", where numeric
+        parts index into lists. Only the value at the path is copied.
+
+        Args:
+            path (str|list): A dotted path, or a list of keys and indexes
+        """
+
+        accessor = compile_path(path)
+        value = accessor.get(self.read(accessor.root))
+
+        if value is MISSING:
+            return default
+
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+    def set_path(self, path, value):
+        """
+        Sets the value at a nested path, creating the dicts missing along the way.
+
+        Raises:
+            Exception if the path runs into a value that isn't a dict or list
+        """
+
+        accessor = compile_path(path)
+        root = self.read(accessor.root)
+
+        if not accessor.steps:
+            return self.set(accessor.root, value)
+
+        self.set(accessor.root, accessor.set({} if root is MISSING else copy.deepcopy(root), value))
+
+    def has(self, key):
+        return self.read(key) is not MISSING
+
+    def cache_info(self):
+        """ Returns the hits, misses, size and hit rate of the snapshot """
+        total = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.snapshot),
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+def weak_on_change(instance, settings):
+    """
+    Returns a change callback calling instance.on_change, which doesn't keep the instance
+    alive and removes itself from the settings once the instance is collected.
+    """
+
+    ref = weakref.ref(instance)
+    tag = instance.tag
+
+    def on_change():
+        instance = ref()
+
+        if instance is not None:
+            instance.on_change()
+        else:
+            # Not while sublime is calling the callbacks
+            sublime.set_timeout(lambda: settings.clear_on_change(tag), 0)
+
+    return on_change
+
+
+pending_saves = set()
+
+def flush_all():
+    """
+    Saves every Settings object with a scheduled save. Packages using save_delay should
+    call this from their plugin_unloaded, so no changes are lost.
+    """
+
+    for settings in list(pending_saves):
+        settings.flush()
+
+    pending_saves.clear()
+
+
+def plugin_unloaded():
+    flush_all()
+
+
+class SettingsFlushListener(sublime_plugin.EventListener):
+    """ Saves pending settings when sublime exits, on_exit is only called by ST4 """
+
+    def on_exit(self):
+        flush_all()
+
+
+class PathAccessor(object):
+    """
+    A parsed settings path. The first part of the path is the settings key, the rest
+    are steps into the value of that key, each a dict key or list index.
+    """
+
+    __slots__ = ('path', 'root', 'steps')
+
+    def __init__(self, path):
+        parts = path.split('.') if isinstance(path, str) else list(path)
+
+        if not parts or parts[0] == '':
+            raise Exception('Invalid settings path ' + str(path))
+
+        self.path = path
+        self.root = str(parts[0])
+        self.steps = tuple(
+            (str(part), int(part) if str(part).isdigit() else None)
+            for part in parts[1:]
+        )
+
+    def get(self, value):
+        """ Returns the value at the end of the steps, or MISSING """
+
+        for key, index in self.steps:
+            if isinstance(value, dict):
+                value = value.get(key, MISSING)
+            elif isinstance(value, list) and index is not None and index < len(value):
+                value = value[index]
+            else:
+                return MISSING
+
+        return value
+
+    def set(self, root, value):
+        """ Sets the value at the end of the steps in root, and returns root """
+
+        container = root
+
+        for i, (key, index) in enumerate(self.steps):
+            last = i == len(self.steps) - 1
+
+            if isinstance(container, dict):
+                if last:
+                    container[key] = value
+                elif not isinstance(container.get(key), (dict, list)):
+                    container[key] = {}
+
+                container = container[key]
+            elif isinstance(container, list) and index is not None and index <= len(container):
+                if index == len(container):
+                    container.append(value if last else {})
+                elif last:
+                    container[index] = value
+
+                container = container[index]
+            else:
+                raise Exception('Can not set {}, the value holding "{}" is not a dict or list'.format(self.path, key))
+
+        return root
+
+
+_accessors = {}
+
+PATH_CACHE_SIZE = 1024
+
+def compile_path(path):
+    """
+    Returns the PathAccessor for a path, parsing it only the first time it's used.
+
+    Args:
+        path (str|list): A dotted path, e.g. "linters.eslint.args.0", or a list of keys
+    """
+
+    key = path if isinstance(path, str) else tuple(path)
+    accessor = _accessors.get(key)
+
+    if accessor is None:
+        if len(_accessors) >= PATH_CACHE_SIZE:
+            _accessors.clear()
+
+        accessor = _accessors[key] = PathAccessor(path)
 
-    # def get_path(self, path, default=None):
-    #     """
-    #     Returns the object at the neste property
-    #     TODO:
-    #     """
-    #     pass
+    return accessor
+
+
+class SettingsResolver(object):
+    """
+    Resolves settings through layers, in order of precedence: the view's settings, the
+    project's settings, package settings (which sublime already merges user over
+    default), and finally a dict of defaults. Keys listed in platform_keys hold a
+    value per platform, e.g. { "osx": "/usr/local/bin/node" }, and fall through to the
+    next layer when the current platform isn't set.
+
+    Resolved keys are kept in a table that is emptied when the view or package settings
+    change, so resolving a key again is a single dict lookup. Project data has no change
+    notification, call invalidate() after changing it.
+
+    Example:
+        resolver = SettingsResolver(
+            view=view,
+            settings=[Settings('PackageName.sublime-settings')],
+            project_key='PackageName',
+            platform_keys=['node_path'],
+        )
+
+        resolver.get('node_path')
+    """
+
+    def __init__(self, settings=(), view=None, window=None, project_key=None, platform_keys=(), defaults=None, keys=()):
+        self.settings = list(settings)
+        self.view = view
+        self.window = window if window is not None or view is None else view.window()
+        self.project_key = project_key
+        self.platform_keys = set(platform_keys)
+        self.defaults = defaults or {}
+        self.platform = sublime.platform()
+        self.tag = 'SublimeTools.SettingsResolver.{}'.format(id(self))
+        self.table = {}
+        self.layers = None
+        self.keys = list(keys)
+        self.rebuilds = 0
+
+        for layer in self.watched():
+            layer.add_on_change(self.tag, self.invalidate)
+
+        self.rebuild()
+
+    def watched(self):
+        """ Returns the sublime.Settings objects whose changes invalidate the table """
+
+        watched = [self.view.settings()] if self.view is not None else []
+
+        for settings in self.settings:
+            if isinstance(settings, Settings):
+                watched.append(settings.ensure_loaded())
+            else:
+                watched.append(settings)
+
+        return watched
+
+    def project_settings(self):
+        data = self.window.project_data() if self.window is not None else None
+        settings = data.get('settings', {}) if isinstance(data, dict) else {}
+
+        if self.project_key is not None:
+            settings = settings.get(self.project_key, {})
+
+        return settings if isinstance(settings, dict) else {}
+
+    def rebuild(self):
+        """ Reads the layers again and resolves the keys passed to the constructor """
+
+        layers = [self.view.settings()] if self.view is not None else []
+        layers.append(self.project_settings())
+        layers.extend(self.settings)
+        layers.append(self.defaults)
+
+        self.layers = layers
+        self.table = {}
+        self.rebuilds += 1
+
+        for key in self.keys:
+            self.table[key] = self.lookup(key)
+
+    def invalidate(self):
+        self.layers = None
+
+    def lookup(self, key):
+        """ Returns the value of a key from the first layer that has it, or MISSING """
+
+        for layer in self.layers:
+            if isinstance(layer, dict):
+                value = layer.get(key, MISSING)
+            elif isinstance(layer, Settings):
+                value = layer.read(key)
+            else:
+                value = layer.get(key) if layer.has(key) else MISSING
+
+            if value is MISSING:
+                continue
+
+            if key in self.platform_keys:
+                value = value.get(self.platform) if isinstance(value, dict) else None
+
+                if value is None:
+                    continue
+
+            return value
+
+        return MISSING
+
+    def get(self, key, default=None):
+        if self.layers is None:
+            self.rebuild()
+
+        value = self.table.get(key, MISSING)
+
+        if value is MISSING and key not in self.table:
+            value = self.table[key] = self.lookup(key)
+
+        if value is MISSING:
+            return default
+
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
 
     def has(self, key):
-        return self.loaded_settings.has(key)
+        return self.get(key, MISSING) is not MISSING
+
+    def close(self):
+        """ Stops listening to changes to the settings """
+
+        for layer in self.watched():
+            layer.clear_on_change(self.tag)
 
 
 def get_platform_setting(key, settings=[]):
@@ -55,13 +565,15 @@ def get_platform_setting(key, settings=[]):
         settings (list): A list of settings to retrieve the node_path from
     """
 
+    platform = sublime.platform()
+
     for setting in settings:
         paths = setting.get(key)
 
         if not isinstance(paths, dict):
             continue
 
-        node_path = paths[sublime.platform()] if sublime.platform() in paths else None
+        node_path = paths[platform] if platform in paths else None
 
         if node_path is not None:
             return node_path
@@ -0,0 +1,291 @@
+import codecs
+import json
+import re
+import threading
+
+from .EventEmitter import EventEmitter
+from .View import RenderLocation
+
+
+CONTAINER = re.compile(r'[{\[]')
+STRUCTURE = re.compile(r'[{}\[\]"]')
+STRING = re.compile(r'["\\]')
+
+
+class JSONStreamParser(object):
+    """
+    Parses a stream of JSON text into records as soon as each of them is complete.
+    Records are either the elements of a top level array, or top level values when
+    the stream is newline delimited JSON. Records must be objects or arrays, other
+    values are skipped.
+
+    Text outside of the JSON, like warnings a tool prints before its output, is
+    skipped, and records that fail to parse are counted in `errors` rather than
+    raised. Feeding is thread safe.
+
+    Only the text of the record being parsed is buffered.
+
+    Example:
+        parser = JSONStreamParser()
+        parser.feed(b'[{"a": 1}, {"b"')  # [{'a': 1}]
+        parser.feed(b': 2}]')            # [{'b': 2}]
+        parser.close()                   # []
+
+    Attributes:
+        records (int): The amount of records parsed
+        errors (int): The amount of records that failed to parse
+    """
+
+    def __init__(self, encoding='utf-8'):
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self.lock = threading.RLock()
+        self.buffer = ''
+        self.position = 0
+        self.base = None
+        self.depth = 0
+        self.start = None
+        self.in_string = False
+        self.records = 0
+        self.errors = 0
+
+    def feed(self, data, final=False):
+        """
+        Parses a chunk of bytes or text.
+
+        Returns:
+            list of the records completed by the chunk
+        """
+
+        with self.lock:
+            return self._feed(data, final)
+
+    def _feed(self, data, final):
+        if isinstance(data, bytes):
+            data = self.decoder.decode(data, final)
+
+        text = self.buffer + data
+        i = self.position
+        records = []
+
+        while True:
+            if self.base is None:
+                # Skip to the JSON, a top level array holds the records, otherwise
+                # each value is a record
+                match = CONTAINER.search(text, i)
+
+                if match is None:
+                    i = len(text)
+                    break
+
+                if match.group() == '[':
+                    self.base = self.depth = 1
+                    i = match.end()
+                else:
+                    self.base = self.depth = 0
+                    i = match.start()
+
+            if self.in_string:
+                match = STRING.search(text, i)
+
+                if match is None:
+                    i = len(text)
+                    break
+
+                if match.group() == '\\':
+                    # Wait for the escaped character to arrive
+                    if match.end() >= len(text):
+                        i = match.start()
+                        break
+
+                    i = match.end() + 1
+                    continue
+
+                self.in_string = False
+                i = match.end()
+                continue
+
+            match = STRUCTURE.search(text, i)
+
+            if match is None:
+                i = len(text)
+                break
+
+            char = match.group()
+            i = match.end()
+
+            if char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == self.base:
+                    self.start = match.start()
+
+                self.depth += 1
+            elif self.depth > self.base:
+                self.depth -= 1
+
+                if self.depth == self.base and self.start is not None:
+                    try:
+                        records.append(json.loads(text[self.start:i]))
+                    except ValueError:
+                        self.errors += 1
+
+                    self.start = None
+            elif self.base:
+                # The end of the top level array, look for more JSON after it
+                self.base = None
+                self.depth = 0
+
+        keep = self.start if self.start is not None else i
+        self.buffer = text[keep:]
+        self.position = i - keep
+
+        if self.start is not None:
+            self.start = 0
+
+        self.records += len(records)
+
+        return records
+
+    def close(self):
+        """
+        Parses whatever remains of the stream.
+
+        Raises:
+            Exception if the stream ended in the middle of a record
+        """
+
+        with self.lock:
+            records = self._feed(b'', True)
+
+            if self.start is not None or self.in_string:
+                raise Exception('Unexpected end of JSON stream')
+
+            return records
+
+
+def estree_location(record):
+    """
+    Returns the arguments for a RenderLocation from an ESTree style record, which has
+    a `loc` with 1 based lines and 0 based columns, and `start`/`end` offsets.
+
+    Example:
+        record = {
+            'start': 6,
+            'end': 9,
+            'loc': { 'start': { 'line': 1, 'column': 6 }, 'end': { 'line': 1, 'column': 9 } },
+        }
+
+        RenderLocation(**estree_location(record))
+    """
+
+    loc = record.get('loc') if isinstance(record.get('loc'), dict) else {}
+    location = {}
+
+    if isinstance(record.get('start'), int):
+        location['position'] = { 'start': record['start'], 'end': record.get('end') }
+
+    for side in ('start', 'end'):
+        value = loc.get(side)
+
+        if isinstance(value, dict) and isinstance(value.get('line'), int):
+            location[side] = { 'line': value['line'] - 1, 'column': value.get('column') }
+
+    return location
+
+
+class LocationStream(EventEmitter):
+    """
+    Turns the JSON output of a tool into locations while the tool is still running.
+    A "location" event is emitted with each location and the record it came from,
+    and an "end" event once the process finishes.
+
+    Locations are RenderLocations, or rows of the LocationTable passed.
+
+    A process listener receives stderr along with stdout, from separate threads.
+    Feeding is serialized, and text around the JSON is skipped, but stderr written
+    in the middle of a record can still break it. Redirect stderr to keep it out.
+
+    Example:
+        listener = ProcessListener(keep_data=False)
+        stream = LocationStream().attach(listener)
+
+        @stream.on('location')
+        def on_location(location, record):
+            print(location.to_region(view))
+
+        exec_cmd('eslint --format json {} 2>{}'.format(filename, os.devnull), listener=listener)
+
+    Attributes:
+        locations (int): The amount of locations parsed
+    """
+
+    def __init__(self, transform=estree_location, table=None):
+        EventEmitter.__init__(self)
+        self.parser = JSONStreamParser()
+        self.transform = transform
+        self.table = table
+        self.locations = 0
+        self.lock = threading.RLock()
+
+    def attach(self, listener):
+        """ Subscribes to the data and finish events of a ProcessListener """
+
+        listener.on('data', self.on_data)
+        listener.on('finish', self.on_finish)
+
+        return self
+
+    def on_data(self, proc, data):
+        self.feed(data)
+
+    def on_finish(self, proc, data=None):
+        self.close()
+
+    def feed(self, data):
+        """ Parses a chunk of output, returning the locations it completed """
+
+        with self.lock:
+            return self.to_locations(self.parser.feed(data))
+
+    def close(self):
+        with self.lock:
+            locations = self.to_locations(self.parser.close())
+            self.emit('end', self.locations)
+
+            return locations
+
+    def to_locations(self, records):
+        locations = []
+
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+
+            args = self.transform(record)
+
+            if self.table is not None:
+                location = self.table[self.table.append(**args)]
+            else:
+                location = RenderLocation(**args)
+
+            self.locations += 1
+            locations.append(location)
+            self.emit('location', location, record)
+
+        return locations
+
+
+def iter_locations(chunks, **kwargs):
+    """
+    Yields locations from an iterable of output chunks as each of them completes.
+    Takes the same options as LocationStream.
+    """
+
+    stream = LocationStream(**kwargs)
+
+    for chunk in chunks:
+        for location in stream.feed(chunk):
+            yield location
+
+    for location in stream.close():
+        yield location
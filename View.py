@@ -1,7 +1,15 @@
 import collections
+import collections.abc
+import os
+import re
+import time
 
 import sublime
+import sublime_plugin
 
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 from sublime import Region
 
 from .Utils import pluck
@@ -11,12 +19,261 @@ def is_length(value):
     return isinstance(value, int) and value >= 0
 
 
+class LineIndex(object):
+    """
+    An index of where each line of a view's buffer starts, used to convert lines and
+    columns to points (and back) without a round trip to the view for every location.
+
+    It implements text_point, rowcol and size like sublime.View does, so it can be passed
+    to any of the location classes in place of the view.
+
+    Example:
+        index = get_line_index(view)
+        regions = [RenderLocation(**loc).to_region(index) for loc in locs]
+
+    Attributes:
+        lines (array): The point at which each line starts
+        length (int): The size of the buffer the index was built from
+        version (int): The change count of the view the index was built from
+    """
+
+    def __init__(self, text, version=None):
+        self.lines = array('l', [0])
+        self.lines.extend(accumulate(len(line) + 1 for line in text.split('\n')))
+        self.lines.pop()
+        self.length = len(text)
+        self.version = version
+
+    def __len__(self):
+        return len(self.lines)
+
+    def size(self):
+        return self.length
+
+    def text_point(self, line, column):
+        """ Returns the point of a line and column, clamped to the size of the buffer """
+
+        lines = self.lines
+        point = lines[line if line < len(lines) else -1] + column
+
+        return point if point < self.length else self.length
+
+    def rowcol(self, point):
+        """ Returns a (line, column) tuple for a point """
+
+        point = min(max(point, 0), self.length)
+        line = bisect_right(self.lines, point) - 1
+
+        return (line, point - self.lines[line])
+
+
+_line_indexes = collections.OrderedDict()
+
+LINE_INDEX_CACHE_SIZE = 16
+
+def cached_for_view(cache, key, view, build, size=LINE_INDEX_CACHE_SIZE):
+    """
+    Returns the value cached under the key, calling build(text, change_count) to
+    rebuild it if the view has changed since it was cached. Values must have a
+    version attribute holding the change count they were built from. The least
+    recently used values are evicted once the cache holds more than `size` values.
+    """
+
+    change_count = view.change_count()
+    value = cache.get(key)
+
+    if value is None or value.version != change_count:
+        value = cache[key] = build(view.substr(Region(0, view.size())), change_count)
+
+    cache.move_to_end(key)
+
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+    return value
+
+
+def get_line_index(view):
+    """
+    Returns the LineIndex for a view, building it only if the view has changed since
+    the index was last built. The least recently used indexes are evicted once more
+    than LINE_INDEX_CACHE_SIZE views are indexed.
+
+    Args:
+        view (sublime.View): The view to index
+
+    Returns:
+        LineIndex
+    """
+
+    return cached_for_view(_line_indexes, view.id(), view, LineIndex)
+
+
+class OffsetTable(object):
+    """
+    Translates offsets counted in UTF-16 code units or UTF-8 bytes, as reported by
+    node tools, to points, which Sublime counts in code points, and back. Only the
+    characters taking more than one unit are stored, so each translation is a
+    bisect, or a linear walk when translating a sorted list of offsets.
+
+    Example:
+        table = get_offset_table(view, 'utf-16')
+        point = table.to_point(diagnostic['offset'])
+
+    Attributes:
+        points (array): The point of each character wider than one unit
+        offsets (array): The offset of each of those characters
+        widths (array): The amount of units each of those characters take
+        version (int): The change count of the view the table was built from
+    """
+
+    PATTERNS = {
+        'utf-16': re.compile('[\U00010000-\U0010ffff]'),
+        'utf-8': re.compile('[^\x00-\x7f]'),
+    }
+
+    def __init__(self, text, version=None, encoding='utf-16'):
+        if encoding not in OffsetTable.PATTERNS:
+            raise Exception('encoding (enum:"utf-16"|"utf-8"), got ' + str(encoding))
+
+        self.encoding = encoding
+        self.version = version
+        self.points = array('l')
+        self.offsets = array('l')
+        self.widths = array('l')
+        self.length = len(text)
+
+        extra = 0
+
+        for match in OffsetTable.PATTERNS[encoding].finditer(text):
+            point = match.start()
+            code = ord(match.group())
+
+            if encoding == 'utf-16':
+                width = 2
+            else:
+                width = 2 if code < 0x800 else 3 if code < 0x10000 else 4
+
+            self.points.append(point)
+            self.offsets.append(point + extra)
+            self.widths.append(width)
+            extra += width - 1
+
+        self.encoded_length = self.length + extra
+
+    def to_point(self, offset):
+        """
+        Returns the point a UTF-16 or UTF-8 offset is at. An offset within a character
+        returns the point of the character.
+        """
+
+        return self.point_at(bisect_right(self.offsets, offset) - 1, offset)
+
+    def point_at(self, i, offset):
+        """ Returns the point of an offset, given the index of the last wide character before it """
+
+        if i < 0:
+            return min(offset, self.length)
+
+        end = self.offsets[i] + self.widths[i]
+
+        if offset < end:
+            return self.points[i]
+
+        return min(self.points[i] + 1 + offset - end, self.length)
+
+    def to_offset(self, point):
+        """ Returns the UTF-16 or UTF-8 offset of a point """
+
+        i = bisect_left(self.points, point)
+
+        if i == 0:
+            return point
+
+        i -= 1
+
+        return point + self.offsets[i] + self.widths[i] - self.points[i] - 1
+
+    def to_points(self, offsets):
+        """
+        Translates a list of offsets to points. Sorted offsets are translated in a
+        single walk over the table, the rest are bisected.
+        """
+
+        if any(offsets[i] > offsets[i + 1] for i in range(0, len(offsets) - 1)):
+            return [self.to_point(offset) for offset in offsets]
+
+        table = self.offsets
+        points = []
+        i = -1
+
+        for offset in offsets:
+            while i + 1 < len(table) and table[i + 1] <= offset:
+                i += 1
+
+            points.append(self.point_at(i, offset))
+
+        return points
+
+    def to_offsets(self, points):
+        return [self.to_offset(point) for point in points]
+
+    def to_position(self, position):
+        """ Translates a Position of offsets to a Position of points """
+
+        return Position(
+            self.to_point(position.a) if position.has_begin() else None,
+            self.to_point(position.b) if position.has_end() else -1,
+        )
+
+
+_offset_tables = collections.OrderedDict()
+
+def get_offset_table(view, encoding='utf-16'):
+    """
+    Returns the OffsetTable for a view and encoding, building it only if the view
+    has changed since the table was last built.
+
+    Args:
+        view (sublime.View): The view to build the table for
+        encoding (str): Either "utf-16" or "utf-8"
+
+    Returns:
+        OffsetTable
+    """
+
+    build = lambda text, version: OffsetTable(text, version, encoding=encoding)
+
+    return cached_for_view(_offset_tables, (view.id(), encoding), view, build)
+
+
+def translate_positions(view, positions, encoding='utf-16'):
+    """
+    Translates a list of Positions counted in UTF-16 code units or UTF-8 bytes to
+    Positions counted in points.
+
+    Returns:
+        list of Position
+    """
+
+    table = get_offset_table(view, encoding)
+    begins = table.to_points([position.a if position.has_begin() else 0 for position in positions])
+    ends = table.to_points([position.b if position.has_end() else 0 for position in positions])
+
+    return [
+        Position(begin if position.has_begin() else None, end if position.has_end() else -1)
+        for position, begin, end in zip(positions, begins, ends)
+    ]
+
+
 class Position(object):
     """
     Represents an AST position object.
     Represents
     """
 
+    __slots__ = ('a', 'b')
+
     def __init__(self, start=None, end=None):
         self.a = start if is_length(start) else None
 
@@ -44,14 +301,24 @@ class Position(object):
         Allows comparing with regions or other iterables
         """
 
+        if isinstance(other, Position):
+            return other.a == self.a and other.b == self.b
+
         if isinstance(other, Region):
             return other.begin() == self.a and other.end() == self.b
 
-        if not isinstance(other, collections.Iterable) or len(other) < 2:
+        if not isinstance(other, (tuple, list)) and not isinstance(other, collections.abc.Iterable):
+            return False
+
+        if len(other) < 2:
             return False
 
         return other[0] == self.a and other[1] == self.b
 
+    def __hash__(self):
+        """ Hashes like the (start, end) tuple it equals """
+        return hash((self.a, self.b))
+
     def __iter__(self):
         yield self.a
         yield self.b
@@ -95,6 +362,8 @@ class SimpleLocation(object):
     Creates a simple location representing a line and column.
     """
 
+    __slots__ = ('line', 'column')
+
     def __init__(self, line, column, **kwargs):
         self.line = line if is_length(line) else None
         self.column = column if is_length(column) else None
@@ -115,6 +384,15 @@ class SimpleLocation(object):
     def __str__(self):
         return '({}:{})'.format(self.line, self.column)
 
+    def __eq__(self, other):
+        if not isinstance(other, SimpleLocation):
+            return False
+
+        return other.line == self.line and other.column == self.column
+
+    def __hash__(self):
+        return hash((self.line, self.column))
+
     def has_line(self):
         """ Return true if the line is an int and more than -1 """
         return is_length(self.line)
@@ -128,7 +406,12 @@ class SimpleLocation(object):
         return self.has_line() and self.has_column()
 
     def to_point(self, view):
-        """ Converts the line and column to a point in a view's buffer """
+        """
+        Converts the line and column to a point in a view's buffer
+
+        Args:
+            view (sublime.View|LineIndex): Pass a LineIndex when converting many locations
+        """
 
         if self.is_valid():
             return view.text_point(self.line, self.column)
@@ -159,17 +442,28 @@ class ComplexLocation(object):
         end (SimpleLocation): The ending location
     """
 
+    __slots__ = ('start', 'end')
+
     def __init__(self, start=None, end=None, **kwargs):
         self.start = SimpleLocation(*pluck(start, 'line', 'column'))
         self.end = SimpleLocation(*pluck(end, 'line', 'column'))
 
+    def __eq__(self, other):
+        if not isinstance(other, ComplexLocation):
+            return False
+
+        return other.start == self.start and other.end == self.end
+
+    def __hash__(self):
+        return hash((self.start.line, self.start.column, self.end.line, self.end.column))
+
     def to_region(self, view):
         """
         Returns a region spanning from the start line and column to the end line and colum, or
         None if the start or end locations have invalid line or columns.
 
         Args:
-            view (sublime.View): The view's buffer will be used in calculating the region's points
+            view (sublime.View|LineIndex): The view's buffer will be used in calculating the region's points
 
         Returns:
             sublime.Region or None if the start or end location are invalid
@@ -206,6 +500,8 @@ class RenderLocation(object):
     END_LINE = 1 << 4
     END_COLUMN = 1 << 5
 
+    __slots__ = ('loc', 'pos')
+
     def __init__(self, position=None, start=None, end=None, **kwargs):
         pos_start, pos_end = pluck(position, 'start', 'end')
 
@@ -215,6 +511,23 @@ class RenderLocation(object):
     def __str__(self):
         return 'RenderLocation({})'.format(str(self.to_json()))
 
+    def __eq__(self, other):
+        if not isinstance(other, RenderLocation):
+            return False
+
+        return other.key() == self.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self):
+        """ Returns a tuple of the position and the lines and columns, used to compare locations """
+        return (
+            self.pos.a, self.pos.b,
+            self.loc.start.line, self.loc.start.column,
+            self.loc.end.line, self.loc.end.column,
+        )
+
     def to_region(self, view):
         """
         Returns a region spanning from the starting line and column to the
@@ -227,7 +540,7 @@ class RenderLocation(object):
         The view is used to translate the line and column points when the position
 
         Args:
-            view (sublime.View):
+            view (sublime.View|LineIndex):
 
         Returns:
             sublime.Region
@@ -295,6 +608,584 @@ class RenderLocation(object):
         return None
 
 
+class LocationTable(object):
+    """
+    Stores render locations column by column in parallel arrays, rather than as a
+    RenderLocation per location. Missing or invalid values are stored as -1. Rows are
+    handed out as LocationRow objects, which have the same API as a RenderLocation.
+
+    Example:
+        table = LocationTable()
+        table.append(position={ 'start': 0, 'end': 4 })
+        table.append(start={ 'line': 0, 'column': 0 }, end={ 'line': 1, 'column': 2 })
+
+        for row in table:
+            print(row.to_region(view))
+
+        view.add_regions('lint', table.to_regions(view), 'invalid')
+    """
+
+    def __init__(self, locations=None):
+        self.begins = array('l')
+        self.ends = array('l')
+        self.start_lines = array('l')
+        self.start_columns = array('l')
+        self.end_lines = array('l')
+        self.end_columns = array('l')
+
+        if locations is not None:
+            self.extend(locations)
+
+    def __len__(self):
+        return len(self.begins)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self.begins)
+
+        if not 0 <= row < len(self.begins):
+            raise IndexError('LocationTable index out of range')
+
+        return LocationRow(self, row)
+
+    def __iter__(self):
+        for row in range(0, len(self.begins)):
+            yield LocationRow(self, row)
+
+    def append(self, position=None, start=None, end=None, **kwargs):
+        """ Appends a location, taking the same arguments as RenderLocation """
+
+        pos_start, pos_end = pluck(position, 'start', 'end')
+        start_line, start_column = pluck(start, 'line', 'column')
+        end_line, end_column = pluck(end, 'line', 'column')
+
+        begin = pos_start if is_length(pos_start) else -1
+
+        self.begins.append(begin)
+        self.ends.append(begin if pos_end is None else pos_end if is_length(pos_end) else -1)
+        self.start_lines.append(start_line if is_length(start_line) else -1)
+        self.start_columns.append(start_column if is_length(start_column) else -1)
+        self.end_lines.append(end_line if is_length(end_line) else -1)
+        self.end_columns.append(end_column if is_length(end_column) else -1)
+
+        return len(self.begins) - 1
+
+    def extend(self, locations):
+        """ Appends a list of raw location dicts """
+
+        for location in locations:
+            self.append(**location)
+
+    def to_regions(self, view):
+        """ Returns the regions of all of the rows that can be rendered, refer to LocationRow.to_region """
+
+        index = None
+        regions = []
+
+        for row in range(0, len(self.begins)):
+            begin = self.begins[row]
+            end = self.ends[row]
+
+            if begin < 0 or end < 0:
+                if index is None:
+                    index = view if isinstance(view, LineIndex) else get_line_index(view)
+
+                begin, end = self.points(row, index)
+
+                if begin is None or end is None:
+                    continue
+
+            regions.append(Region(begin, end))
+
+        return regions
+
+    def points(self, row, view):
+        """ Returns a (start point, end point) tuple for a row, either may be None """
+
+        begin = self.begins[row]
+        end = self.ends[row]
+
+        if begin < 0:
+            line = self.start_lines[row]
+            column = self.start_columns[row]
+            begin = view.text_point(line, column) if line >= 0 and column >= 0 else None
+
+        if end < 0:
+            line = self.end_lines[row]
+            column = self.end_columns[row]
+            end = view.text_point(line, column) if line >= 0 and column >= 0 else None
+
+        return begin, end
+
+
+class LocationRow(object):
+    """
+    A lightweight view of a row in a LocationTable, with the same API as RenderLocation.
+    """
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __str__(self):
+        return 'LocationRow({})'.format(str(self.to_json()))
+
+    def to_region(self, view):
+        """ Refer to RenderLocation.to_region """
+        begin, end = self.table.points(self.row, view)
+
+        if begin is None or end is None:
+            return None
+
+        return Region(begin, end)
+
+    def to_json(self):
+        table = self.table
+        row = self.row
+
+        return {
+            'start': {
+                'line': table.start_lines[row] if table.start_lines[row] >= 0 else None,
+                'column': table.start_columns[row] if table.start_columns[row] >= 0 else None,
+            },
+            'end': {
+                'line': table.end_lines[row] if table.end_lines[row] >= 0 else None,
+                'column': table.end_columns[row] if table.end_columns[row] >= 0 else None,
+            },
+        }
+
+    def render_ability(self):
+        """ Refer to RenderLocation.render_ability """
+        table = self.table
+        row = self.row
+
+        mask = 0
+        mask |= RenderLocation.BEGIN        if table.begins[row] >= 0        else 0
+        mask |= RenderLocation.END          if table.ends[row] >= 0          else 0
+        mask |= RenderLocation.START_LINE   if table.start_lines[row] >= 0   else 0
+        mask |= RenderLocation.START_COLUMN if table.start_columns[row] >= 0 else 0
+        mask |= RenderLocation.END_LINE     if table.end_lines[row] >= 0     else 0
+        mask |= RenderLocation.END_COLUMN   if table.end_columns[row] >= 0   else 0
+
+        return mask
+
+    def start_line(self, view):
+        line = self.table.start_lines[self.row]
+
+        if line >= 0:
+            return line
+        elif self.table.begins[self.row] >= 0:
+            return view.rowcol(self.table.begins[self.row])[0]
+
+        return None
+
+    def end_line(self, view):
+        line = self.table.end_lines[self.row]
+
+        if line >= 0:
+            return line
+        elif self.table.ends[self.row] >= 0:
+            return view.rowcol(self.table.ends[self.row])[0]
+
+        return None
+
+    def start_point(self, view):
+        return self.table.points(self.row, view)[0]
+
+    def end_point(self, view):
+        return self.table.points(self.row, view)[1]
+
+
+def locations_to_points(view, locations):
+    """
+    Converts a list of raw render locations, shaped like the arguments RenderLocation
+    takes, to their start and end points in a single pass. Like RenderLocation.to_region,
+    the position is preferred and the line and column are used when it's missing. Invalid
+    locations are skipped.
+
+    A LineIndex is only built when a location has no position to begin or end at.
+
+    Args:
+        view (sublime.View|LineIndex): The view the locations belong to
+        locations (list of dict): e.g. { 'position': { 'start': 0, 'end': 4 } }
+
+    Returns:
+        A tuple of arrays, (begins, ends, indexes), where indexes holds the index in
+        locations that each of the points were converted from
+    """
+
+    index = view if isinstance(view, LineIndex) else None
+    begins = array('l')
+    ends = array('l')
+    indexes = array('l')
+
+    for i, location in enumerate(locations):
+        if not isinstance(location, dict):
+            continue
+
+        begin = end = None
+        position = location.get('position')
+
+        if isinstance(position, dict):
+            begin = position.get('start')
+            end = position.get('end')
+
+            if end is None:
+                end = begin
+
+        if not isinstance(begin, int) or begin < 0:
+            start = location.get('start')
+
+            if not isinstance(start, dict):
+                continue
+
+            line = start.get('line')
+            column = start.get('column')
+
+            if not isinstance(line, int) or line < 0 or not isinstance(column, int) or column < 0:
+                continue
+
+            if index is None:
+                index = get_line_index(view)
+
+            begin = index.text_point(line, column)
+
+        if not isinstance(end, int) or end < 0:
+            stop = location.get('end')
+
+            if not isinstance(stop, dict):
+                continue
+
+            line = stop.get('line')
+            column = stop.get('column')
+
+            if not isinstance(line, int) or line < 0 or not isinstance(column, int) or column < 0:
+                continue
+
+            if index is None:
+                index = get_line_index(view)
+
+            end = index.text_point(line, column)
+
+        begins.append(begin)
+        ends.append(end)
+        indexes.append(i)
+
+    return begins, ends, indexes
+
+
+def locations_to_regions(view, locations):
+    """
+    Converts a list of raw render locations to regions, ready to be passed to
+    view.add_regions. Refer to locations_to_points.
+
+    Example:
+        view.add_regions('lint', locations_to_regions(view, results), 'invalid')
+
+    Returns:
+        list of sublime.Region
+    """
+
+    begins, ends, _ = locations_to_points(view, locations)
+
+    return list(map(Region, begins, ends))
+
+
+class LocationIndex(object):
+    """
+    An index over the regions of a view's locations, answering which locations overlap
+    a point or region, and which location comes next or before a point. Regions are
+    kept sorted by where they begin, alongside a tree of the furthest end in each span
+    of them, so a query costs O(log n) plus O(log n) per location found.
+
+    Edits to the buffer are applied with apply_change, which shifts only the regions
+    after or around the edit instead of rebuilding the index. On Sublime Text 4, attach
+    does this automatically as the view is edited.
+
+    Example:
+        index = LocationIndex.from_locations(view, results)
+
+        for region, location in index.overlapping(view.sel()[0].b):
+            print(location)
+
+        region, location = index.next(view.sel()[0].b, wrap=True)
+    """
+
+    def __init__(self, begins=(), ends=(), items=None):
+        order = sorted(range(0, len(begins)), key=lambda i: (begins[i], ends[i]))
+
+        self.begins = array('l', (begins[i] for i in order))
+        self.ends = array('l', (ends[i] for i in order))
+        self.items = [items[i] if items is not None else i for i in order]
+        self.size = 1
+
+        while self.size < len(order):
+            self.size *= 2
+
+        self.tree = array('l', [-1]) * (2 * self.size)
+        self.tree[self.size:self.size + len(order)] = self.ends
+        self.refresh(0, len(order))
+
+    @classmethod
+    def from_locations(cls, view, locations):
+        """
+        Indexes raw location dicts or location objects (RenderLocation, LocationRow),
+        skipping the locations that can't be rendered.
+        """
+
+        if all(isinstance(location, dict) for location in locations):
+            begins, ends, indexes = locations_to_points(view, locations)
+
+            return cls(begins, ends, [locations[i] for i in indexes])
+
+        index = view if isinstance(view, LineIndex) else get_line_index(view)
+        begins, ends, items = array('l'), array('l'), []
+
+        for location in locations:
+            region = location.to_region(index)
+
+            if region is not None:
+                begins.append(region.a)
+                ends.append(region.b)
+                items.append(location)
+
+        return cls(begins, ends, items)
+
+    def __len__(self):
+        return len(self.begins)
+
+    def region(self, i):
+        return Region(self.begins[i], self.ends[i])
+
+    def refresh(self, lo, hi):
+        """ Recomputes the tree nodes above the leaves lo to hi """
+
+        if lo >= hi:
+            return
+
+        tree = self.tree
+        lo += self.size
+        hi += self.size - 1
+
+        while lo > 1:
+            lo //= 2
+            hi //= 2
+
+            for node in range(lo, hi + 1):
+                left = tree[2 * node]
+                right = tree[2 * node + 1]
+                tree[node] = left if left > right else right
+
+    def find(self, a, b):
+        """ Returns the sorted indexes of the regions overlapping a to b, inclusive """
+
+        hi = bisect_right(self.begins, b)
+        tree = self.tree
+        size = self.size
+        found = []
+        stack = [(1, 0, size)]
+
+        while stack:
+            node, lo, node_hi = stack.pop()
+
+            if lo >= hi or tree[node] < a:
+                continue
+
+            if node >= size:
+                found.append(lo)
+                continue
+
+            middle = (lo + node_hi) // 2
+            stack.append((2 * node + 1, middle, node_hi))
+            stack.append((2 * node, lo, middle))
+
+        return found
+
+    def overlapping(self, a, b=None):
+        """
+        Returns (region, item) tuples for the regions containing a point, or overlapping
+        the region a to b.
+        """
+
+        return [(self.region(i), self.items[i]) for i in self.find(a, a if b is None else b)]
+
+    def next(self, point, wrap=False):
+        """ Returns the (region, item) beginning after the point, or None """
+
+        i = bisect_right(self.begins, point)
+
+        if i >= len(self.begins):
+            if not wrap or not self.begins:
+                return None
+            i = 0
+
+        return self.region(i), self.items[i]
+
+    def previous(self, point, wrap=False):
+        """ Returns the (region, item) beginning before the point, or None """
+
+        i = bisect_left(self.begins, point) - 1
+
+        if i < 0:
+            if not wrap or not self.begins:
+                return None
+            i = len(self.begins) - 1
+
+        return self.region(i), self.items[i]
+
+    def apply_change(self, point, removed, inserted):
+        """
+        Updates the regions for an edit that replaced `removed` characters at the point
+        with `inserted` characters. Points within the removed text collapse to the point,
+        and regions ending at the point don't grow with text inserted there.
+        """
+
+        delta = inserted - removed
+        removed_end = point + removed
+        begins = self.begins
+        ends = self.ends
+        shift = lambda x: x if x <= point else x + delta if x >= removed_end else point
+
+        # Regions beginning before the edit and ending after it, then the regions after it
+        around = self.find(point + 1, point)
+        start = bisect_right(begins, point)
+
+        for i in around:
+            ends[i] = shift(ends[i])
+            self.tree[self.size + i] = ends[i]
+
+        for i in range(start, len(begins)):
+            begins[i] = shift(begins[i])
+            ends[i] = shift(ends[i])
+
+        self.tree[self.size + start:self.size + len(begins)] = ends[start:]
+
+        self.refresh(around[0] if around else start, len(begins))
+
+    def attach(self, view):
+        """
+        Applies the edits made to a view's buffer as they happen. Returns False when the
+        Sublime Text version can't listen to text changes.
+        """
+
+        if LocationIndexChangeListener is None:
+            return False
+
+        listener = _change_listeners.get(view.buffer_id())
+
+        if listener is None:
+            listener = _change_listeners[view.buffer_id()] = LocationIndexChangeListener()
+            listener.attach(view.buffer())
+
+        listener.indexes.append(self)
+
+        return True
+
+    def detach(self, view):
+        listener = _change_listeners.get(view.buffer_id())
+
+        if listener is not None and self in listener.indexes:
+            listener.indexes.remove(self)
+
+            if not listener.indexes:
+                listener.detach()
+                del _change_listeners[view.buffer_id()]
+
+
+_change_listeners = {}
+
+if hasattr(sublime_plugin, 'TextChangeListener'):
+    class LocationIndexChangeListener(sublime_plugin.TextChangeListener):
+        """ Applies text changes to the location indexes attached to a buffer """
+
+        def __init__(self):
+            super().__init__()
+            self.indexes = []
+
+        @classmethod
+        def is_applicable(cls, buffer):
+            return False
+
+        def on_text_changed(self, changes):
+            for change in changes:
+                for index in self.indexes:
+                    index.apply_change(change.a.pt, change.b.pt - change.a.pt, len(change.str))
+else:
+    LocationIndexChangeListener = None
+
+
+def dedupe_locations(locations):
+    """ Returns the locations with duplicates removed, keeping the first of each in order """
+
+    return list(collections.OrderedDict.fromkeys(locations))
+
+
+def merge_locations(view, items, adjacent=True):
+    """
+    Merges the regions of locations that overlap, or touch when `adjacent` is true,
+    and have the same scope, keeping a list of the sources each merged region came
+    from. Identical locations reported by several tools end up as one region. Items
+    are sorted and swept once, so merging costs O(n log n).
+
+    Example:
+        merged = merge_locations(view, [
+            ({ 'position': { 'start': 0, 'end': 4 } }, 'invalid', 'eslint'),
+            ({ 'position': { 'start': 2, 'end': 6 } }, 'invalid', 'flow'),
+        ])
+        # [(Region(0, 6), 'invalid', ['eslint', 'flow'])]
+
+    Args:
+        view (sublime.View|LineIndex): The view the locations belong to
+        items (list of tuple): (location, scope, source) tuples, where the location is a
+            raw location dict, RenderLocation or LocationRow
+        adjacent (bool, optional): Whether or not to merge regions that only touch
+
+    Returns:
+        list of (sublime.Region, scope, sources) tuples, sorted by scope and region
+    """
+
+    items = list(items)
+    raw = [i for i, item in enumerate(items) if isinstance(item[0], dict)]
+    others = [i for i, item in enumerate(items) if not isinstance(item[0], dict)]
+    index = view if isinstance(view, LineIndex) or not others else get_line_index(view)
+    begins, ends, indexes = locations_to_points(index, [items[i][0] for i in raw])
+    spans = []
+
+    for begin, end, i in zip(begins, ends, indexes):
+        _, scope, source = items[raw[i]]
+        spans.append((scope, min(begin, end), max(begin, end), raw[i], source))
+
+    for i in others:
+        location, scope, source = items[i]
+        region = location.to_region(index)
+
+        if region is not None:
+            spans.append((scope, region.begin(), region.end(), i, source))
+
+    # Sorting by the item's index keeps the sources in the order they were passed
+    spans.sort(key=lambda span: span[:4])
+    merged = []
+
+    for scope, begin, end, _, source in spans:
+        if merged:
+            last = merged[-1]
+            last_end = last[2]
+
+            if last[0] == scope and (begin < last_end or (begin == last_end and (adjacent or begin == last[1]))):
+                last[2] = max(last_end, end)
+
+                if source not in last[3]:
+                    last[3].append(source)
+
+                continue
+
+        merged.append([scope, begin, end, [source]])
+
+    return [(Region(begin, end), scope, sources) for scope, begin, end, sources in merged]
+
+
 def get_from_loc(loc, side, attr):
     """
     Examples:
@@ -356,6 +1247,167 @@ def all_views():
     return views
 
 
+def normalize_path(file_name):
+    """ Returns an absolute, case normalized path, used to compare file names """
+    return os.path.normcase(os.path.abspath(file_name))
+
+
+class ViewRegistry(object):
+    """
+    Keeps every open view indexed by id, normalized file name and basename, so views
+    can be looked up without walking every window. It is kept current by the view
+    lifecycle events of ViewRegistryListener, and resyncs itself from all_views()
+    when it finds a closed view or a view whose file name changed, or, at most every
+    RESYNC_INTERVAL seconds, a miss. File names that miss are also looked for with
+    window.find_open_file, which finds views that are still loading.
+
+    Attributes:
+        resyncs (int): The amount of times the registry was rebuilt from all_views()
+    """
+
+    RESYNC_INTERVAL = 5
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_path = {}
+        self.by_basename = {}
+        self.paths = {}
+        self.synced = False
+        self.synced_at = 0
+        self.resyncs = 0
+
+    def add(self, view):
+        """ Adds or reindexes a view, e.g. after it was saved under another name """
+
+        view_id = view.id()
+        file_name = view.file_name()
+
+        self.remove(view_id)
+        self.by_id[view_id] = view
+
+        if file_name:
+            path = normalize_path(file_name)
+            self.paths[view_id] = path
+            self.by_path.setdefault(path, {})[view_id] = view
+            self.by_basename.setdefault(os.path.basename(path), {})[view_id] = view
+
+    def remove(self, view_id):
+        self.by_id.pop(view_id, None)
+        path = self.paths.pop(view_id, None)
+
+        if path is None:
+            return
+
+        for views, key in ((self.by_path, path), (self.by_basename, os.path.basename(path))):
+            matches = views.get(key)
+
+            if matches is not None:
+                matches.pop(view_id, None)
+
+                if not matches:
+                    del views[key]
+
+    def resync(self):
+        """ Rebuilds the registry from all of the views in all windows """
+
+        self.by_id = {}
+        self.by_path = {}
+        self.by_basename = {}
+        self.paths = {}
+
+        for view in all_views():
+            self.add(view)
+
+        self.synced = True
+        self.synced_at = time.time()
+        self.resyncs += 1
+
+    def lookup(self, find, is_current=None):
+        """
+        Calls find to get a list of views and resyncs when the registry has drifted,
+        i.e. one of the views found is closed or not is_current, or nothing was found
+        in a while.
+        """
+
+        if not self.synced:
+            self.resync()
+
+        views = find()
+
+        if any(not view.is_valid() or (is_current and not is_current(view)) for view in views):
+            self.resync()
+            views = find()
+        elif not views and time.time() - self.synced_at > self.RESYNC_INTERVAL:
+            self.resync()
+            views = find()
+
+        return views
+
+    def get_views_by_ids(self, ids):
+        return self.lookup(lambda: [self.by_id[view_id] for view_id in ids if view_id in self.by_id])
+
+    def get_views_by_file_names(self, file_names, basename=False):
+        to_key = os.path.basename if basename else lambda path: path
+        keys = [to_key(normalize_path(file_name)) for file_name in file_names]
+        expected = set(keys)
+
+        def is_current(view):
+            # The file may have been renamed without the registry hearing about it
+            file_name = view.file_name()
+            return bool(file_name) and to_key(normalize_path(file_name)) in expected
+
+        def find():
+            # Resyncs replace the indexes, so look them up on every call
+            index = self.by_basename if basename else self.by_path
+            return [view for key in keys for view in index.get(key, {}).values()]
+
+        views = self.lookup(find, is_current)
+
+        if not basename:
+            for file_name, key in zip(file_names, keys):
+                if key not in self.by_path:
+                    views.extend(self.find_open_file(file_name))
+
+        return views
+
+    def find_open_file(self, file_name):
+        """ Finds the views of a file the registry missed, e.g. ones still loading, and adds them """
+
+        views = []
+
+        for window in sublime.windows():
+            view = window.find_open_file(file_name)
+
+            if view is not None:
+                self.add(view)
+                views.append(view)
+
+        return views
+
+
+view_registry = ViewRegistry()
+
+
+class ViewRegistryListener(sublime_plugin.EventListener):
+    """ Keeps the view registry current """
+
+    def on_new(self, view):
+        if view_registry.synced:
+            view_registry.add(view)
+
+    def on_clone(self, view):
+        self.on_new(view)
+
+    def on_load(self, view):
+        self.on_new(view)
+
+    def on_post_save(self, view):
+        self.on_new(view)
+
+    def on_close(self, view):
+        view_registry.remove(view.id())
+
+
 def get_views_by_ids(ids):
     """
     Returns a list of views whose ids match the ids passed.
@@ -367,7 +1419,7 @@ def get_views_by_ids(ids):
         list of sublime.View
     """
 
-    return [view for view in all_views() if view.id() in (ids if isinstance(ids, list) else [ids])]
+    return view_registry.get_views_by_ids(ids if isinstance(ids, list) else [ids])
 
 
 def get_views_by_file_names(file_names, basename=False):
@@ -384,21 +1436,136 @@ def get_views_by_file_names(file_names, basename=False):
     if not isinstance(file_names, list):
         file_names = [file_names]
 
-    views = []
+    return view_registry.get_views_by_file_names(file_names, basename=basename)
 
-    if basename:
-        for view in all_views():
-            for file_name in file_names:
-                if view.file_name() and os.path.basename(view.file_name()) == os.path.basename(file_name):
-                    views.append(view)
-    else:
-        for window in sublime.windows():
-            for file_name in file_names:
-                view = window.find_open_file(file_name)
-                if view:
-                    views.append(view)
 
-    return views
+class ScopeCache(object):
+    """
+    Caches scope names and selector matches by point for each view. A view's cache is
+    only valid for the syntax and change count it was filled with, which are checked
+    once per query, or once for a whole list of points, so repeated queries on an
+    unchanged view only cost those two calls. The cache of a view is also emptied
+    as soon as its syntax setting changes.
+
+    The least recently used views are evicted past `max_views`, and the least recently
+    used points of a view past `max_points`.
+
+    Attributes:
+        hits (int): The amount of queries answered from the cache
+        misses (int): The amount of queries that called into the view
+    """
+
+    def __init__(self, max_views=32, max_points=4096):
+        self.max_views = max_views
+        self.max_points = max_points
+        self.views = collections.OrderedDict()
+        self.tag = 'SublimeTools.ScopeCache.{}'.format(id(self))
+        self.hits = 0
+        self.misses = 0
+
+    def entry(self, view):
+        """ Returns the cache of a view, emptied if its syntax or contents changed """
+
+        view_id = view.id()
+        settings = view.settings()
+        stamp = (settings.get('syntax'), view.change_count())
+        entry = self.views.get(view_id)
+
+        if entry is None:
+            settings.add_on_change(self.tag, lambda: self.on_settings_change(view_id))
+
+        if entry is None or entry['stamp'] != stamp:
+            entry = self.views[view_id] = {
+                'stamp': stamp,
+                'settings': settings,
+                'source': None,
+                'scopes': collections.OrderedDict(),
+            }
+
+        self.views.move_to_end(view_id)
+
+        while len(self.views) > self.max_views:
+            self.views.popitem(last=False)[1]['settings'].clear_on_change(self.tag)
+
+        return entry
+
+    def on_settings_change(self, view_id):
+        entry = self.views.get(view_id)
+
+        if entry is not None and entry['settings'].get('syntax') != entry['stamp'][0]:
+            self.invalidate(view_id)
+
+    def lookup(self, entry, key, fetch):
+        scopes = entry['scopes']
+        value = scopes.get(key)
+
+        if value is None:
+            self.misses += 1
+            value = scopes[key] = fetch()
+
+            if len(scopes) > self.max_points:
+                scopes.popitem(last=False)
+        else:
+            self.hits += 1
+            scopes.move_to_end(key)
+
+        return value
+
+    def scope_name(self, view, point):
+        return self.lookup(self.entry(view), point, lambda: view.scope_name(point))
+
+    def scope_names(self, view, points):
+        entry = self.entry(view)
+
+        return [self.lookup(entry, point, lambda: view.scope_name(point)) for point in points]
+
+    def match_selector(self, view, point, selector):
+        return self.match_selectors(view, [point], selector)[0]
+
+    def match_selectors(self, view, points, selector):
+        entry = self.entry(view)
+
+        return [
+            self.lookup(entry, (point, selector), lambda: view.match_selector(point, selector))
+            for point in points
+        ]
+
+    def source_scope(self, view):
+        entry = self.entry(view)
+
+        if entry['source'] is None:
+            entry['source'] = self.lookup(entry, 0, lambda: view.scope_name(0)).split(' ')[0]
+
+        return entry['source']
+
+    def invalidate(self, view_id):
+        """ Empties the cache of a view """
+
+        entry = self.views.get(view_id)
+
+        if entry is not None:
+            entry['stamp'] = None
+
+    def forget(self, view_id):
+        entry = self.views.pop(view_id, None)
+
+        if entry is not None:
+            entry['settings'].clear_on_change(self.tag)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+
+        return self.hits / total if total else 0.0
+
+
+scope_cache = ScopeCache()
+
+
+class ScopeCacheListener(sublime_plugin.EventListener):
+    """ Drops the scope cache of closed views """
+
+    def on_close(self, view):
+        scope_cache.forget(view.id())
 
 
 def get_source_scope(view):
@@ -410,6 +1577,14 @@ def get_source_scope(view):
         The source scope for the view
     """
 
-    return view.scope_name(0).split(' ')[0]
+    return scope_cache.source_scope(view)
+
+
+def scope_names(view, points):
+    """ Returns the scope name at each of the points, refer to ScopeCache """
+    return scope_cache.scope_names(view, points)
 
 
+def match_selectors(view, points, selector):
+    """ Returns whether the selector matches at each of the points, refer to ScopeCache """
+    return scope_cache.match_selectors(view, points, selector)
@@ -6,6 +6,8 @@ is in Javascript at https://github.com/ericelliott/cuid
 import os
 import random
 import socket
+import struct
+import threading
 import time
 
 # Constants describing the cuid algorithm
@@ -13,6 +15,8 @@ import time
 BASE = 36
 BLOCK_SIZE = 4
 DISCRETE_VALUES = BASE ** BLOCK_SIZE
+# Amount of counter values a thread reserves at a time
+COUNTER_BLOCK_SIZE = 64
 
 # Helper functions
 
@@ -37,6 +41,20 @@ def _to_base36(number):  # type: (int) -> str
     return chars or "0"
 
 
+# Every pair of base36 digits, so a block can be encoded with two lookups
+_PAIRS = [a + b for a in _ALPHABET for b in _ALPHABET]
+def _block_to_base36(number):  # type: (int) -> str
+    """
+    Convert an integer below `DISCRETE_VALUES` to a base36 string of
+    `BLOCK_SIZE` length.
+
+    :param int number: integer to convert
+    :rtype: str
+    """
+    high, low = divmod(number, 1296)
+    return _PAIRS[high] + _PAIRS[low]
+
+
 _PADDING = "000000000"
 def _pad(string, size):  # type: (str, int) -> str
     """
@@ -86,11 +104,14 @@ def get_process_fingerprint():  # type: () ->  str
 
 
 _GENERATOR = None  # type: CuidGenerator
+_GENERATOR_LOCK = threading.Lock()
 
 def _generator():  # type: () -> CuidGenerator
     global _GENERATOR
     if not _GENERATOR:
-        _GENERATOR = CuidGenerator()
+        with _GENERATOR_LOCK:
+            if not _GENERATOR:
+                _GENERATOR = CuidGenerator()
     return _GENERATOR
 
 
@@ -101,6 +122,14 @@ def cuid():  # type: () -> str
     return _generator().cuid()
 
 
+def cuid_batch(n):  # type: (int) -> list
+    """
+    :param int n: amount of cuids to generate
+    :rtype: list
+    """
+    return _generator().cuid_batch(n)
+
+
 def slug():  # type: () -> str
     """
     :rtype: str
@@ -111,6 +140,11 @@ def slug():  # type: () -> str
 class CuidGenerator(object):
     """
     Generate cuids
+
+    Safe to use from several threads: each thread reserves blocks of
+    `COUNTER_BLOCK_SIZE` counter values, so the lock is only taken when
+    a block runs out. After a fork the process fingerprint is generated
+    again, unless a fingerprint was given.
     """
 
     def __init__(self, fingerprint=None):
@@ -118,8 +152,58 @@ class CuidGenerator(object):
         """
         :param str fingerprint: process fingerprint to use
         """
-        self.fingerprint = fingerprint or get_process_fingerprint()
+        self._fixed_fingerprint = fingerprint
+        self._fingerprint = fingerprint or get_process_fingerprint()
+        self._pid = os.getpid()
         self._counter = -1
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def fingerprint(self):
+        # type: () -> str
+        """
+        :rtype: str
+        """
+        self._check_pid()
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, fingerprint):
+        # type: (str) -> None
+        self._fixed_fingerprint = fingerprint
+        self._fingerprint = fingerprint
+
+    def _check_pid(self):
+        # type: () -> None
+        # Runs before the lock or thread blocks are touched, since both may
+        # have been inherited from the parent process
+        if os.getpid() != self._pid:
+            self._after_fork()
+
+    def _after_fork(self):
+        # type: () -> None
+        # The lock may have been held by a thread that doesn't exist in
+        # this process, so start over with a new one
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = os.getpid()
+        if not self._fixed_fingerprint:
+            self._fingerprint = get_process_fingerprint()
+
+    def _reserve(self, n):
+        # type: (int) -> int
+        """
+        Reserve `n` consecutive counter values.
+
+        :return: the first value, which may need wrapping
+        :rtype: int
+        """
+        self._check_pid()
+        with self._lock:
+            start = self._counter + 1
+            self._counter = (self._counter + n) % DISCRETE_VALUES
+        return start
 
     @property
     def counter(self):
@@ -131,10 +215,14 @@ class CuidGenerator(object):
         :return: counter value
         :rtype: int
         """
-        self._counter += 1
-        if self._counter >= DISCRETE_VALUES:
-            self._counter = 0
-        return self._counter
+        self._check_pid()
+        local = self._local
+        value = getattr(local, "next", None)
+        if value is None or value >= local.end:
+            value = self._reserve(COUNTER_BLOCK_SIZE)
+            local.end = value + COUNTER_BLOCK_SIZE
+        local.next = value + 1
+        return value % DISCRETE_VALUES
 
     def cuid(self):
         # type: () -> str
@@ -160,6 +248,43 @@ class CuidGenerator(object):
 
         return identifier
 
+    def cuid_batch(self, n):
+        # type: (int) -> list
+        """
+        Generate `n` full-length cuids.
+
+        The timestamp prefix is only encoded again when the millisecond
+        changes, and the random blocks are taken from a single
+        `os.urandom` read.
+
+        :param int n: amount of cuids to generate
+        :rtype: list
+        """
+        fingerprint = self.fingerprint
+        start = self._reserve(n)
+        randomness = struct.unpack(">{}I".format(2 * n), os.urandom(8 * n))
+        block = _block_to_base36
+        clock = time.time
+        millis = None
+        prefix = ""
+        identifiers = []
+
+        for i in range(n):
+            now = int(clock() * 1000)
+            if now != millis:
+                millis = now
+                prefix = "c" + _to_base36(millis)
+
+            identifiers.append(
+                prefix +
+                block((start + i) % DISCRETE_VALUES) +
+                fingerprint +
+                block(randomness[2 * i] % DISCRETE_VALUES) +
+                block(randomness[2 * i + 1] % DISCRETE_VALUES)
+            )
+
+        return identifiers
+
     def slug(self):
         # type: () -> str
         """
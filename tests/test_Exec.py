@@ -4,7 +4,7 @@ import sys
 from unittesting import DeferrableTestCase
 from unittest.mock import MagicMock
 
-from SublimeTools.Exec import exec_cmd, execjsfile, ProcessListener
+from SublimeTools.Exec import exec_cmd, execjsfile, ProcessListener, JobManager, OutputSink
 from SublimeTools.cuid import cuid
 
 
@@ -93,3 +93,80 @@ class TestExec(DeferrableTestCase):
         """ exec_cmd raises ex when on_finish, on_done, and listener is not passed """
 
         self.assertRaises(lambda: exec_cmd('echo "lol"'), msg='wtf')
+
+    def test_job_manager_supersedes(self):
+        """ a newer run for the same key kills the older run and drops its events """
+
+        import os
+
+        jobs = JobManager()
+        stale = MagicMock()
+        latest = MagicMock()
+
+        old_proc = jobs.run('lint', 'sleep 2; echo stale', on_finish=stale)
+        proc = jobs.run('lint', 'echo latest', on_finish=latest)
+
+        yield 2500
+
+        stale.assert_not_called()
+        latest.assert_called_once_with(proc, bytes('latest' + os.linesep, 'utf8'))
+
+        self.assertFalse(jobs.is_current('lint', old_proc))
+        self.assertEqual(jobs.metrics.wasted_runs, 1)
+        self.assertEqual(jobs.metrics.kills, 1)
+        self.assertEqual(jobs.metrics.finished, 1)
+
+    def test_job_manager_failed_run(self):
+        """ a run that fails to start isn't left as the key's current run """
+
+        jobs = JobManager()
+
+        self.assertRaises(Exception, jobs.run, 'lint', ['sublime-tools-missing-binary'], on_finish=MagicMock())
+        self.assertNotIn('lint', jobs.jobs)
+
+    def test_output_sink(self):
+        """ output sink appends buffered process output to a panel """
+
+        import os
+
+        listener = ProcessListener()
+        sink = OutputSink.for_panel(sublime.active_window(), 'sublime_tools_test', show=False)
+        sink.attach(listener)
+
+        exec_cmd('echo lmao; echo rofl', listener=listener)
+
+        yield 2500
+
+        view = sink.view
+
+        self.assertEqual(view.substr(sublime.Region(0, view.size())), 'lmao' + os.linesep + 'rofl' + os.linesep)
+        self.assertEqual(sink.flushes, 1)
+
+    def test_output_sink_threads(self):
+        """ output sink decodes the chunks written by each thread separately """
+
+        import threading
+
+        sink = OutputSink.for_panel(sublime.active_window(), 'sublime_tools_test', show=False)
+        encoded = 'é'.encode('utf-8')
+
+        def write():
+            for i in range(100):
+                sink.write(encoded[:1])
+                sink.write(encoded[1:])
+
+        threads = [threading.Thread(target=write) for i in range(2)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        sink.write(b'', final=True)
+
+        yield 500
+
+        view = sink.view
+
+        self.assertEqual(view.substr(sublime.Region(0, view.size())), 'é' * 200)
@@ -0,0 +1,191 @@
+import os
+import shutil
+import sublime
+import tempfile
+
+from unittest import TestCase
+
+version = sublime.version()
+
+from SublimeTools.Logging import AsyncSink, Logger, RateLimiter, RingBufferSink, RotatingFileSink, Spans, spans
+from SublimeTools.Logging import DEBUG, DEFAULT_LEVELS, ERROR, CRITICAL, INFO, WARNING
+
+
+class TestLogging(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_async_sink(self):
+        ring = RingBufferSink(size=3)
+        sink = AsyncSink([ring])
+        logger = Logger('Test', sinks=[sink])
+
+        logger.info('hello', 1)
+
+        for i in range(10):
+            logger.debug('line', i)
+
+        logger.flush()
+
+        self.assertEqual(ring.dump(), ['Test:DEBUG line 7', 'Test:DEBUG line 8', 'Test:DEBUG line 9'])
+        ring.dump(clear=True)
+        self.assertEqual(ring.dump(), [])
+        self.assertEqual(sink.dropped, 0)
+
+    def test_full_queue_drops(self):
+        sink = AsyncSink([RingBufferSink()], max_size=2)
+        # Pretend the thread is running but stuck so nothing drains the queue
+        sink.thread = True
+
+        sink.write(['a', 'b', 'c', 'd'])
+
+        self.assertEqual(sink.dropped, 2)
+
+    def test_rotating_file_sink(self):
+        path = os.path.join(self.directory, 'test.log')
+        sink = RotatingFileSink(path, max_bytes=100, backups=2)
+
+        for i in range(30):
+            sink.write(['line {}'.format(i)])
+
+        sink.close()
+
+        self.assertEqual(sorted(os.listdir(self.directory)), ['test.log', 'test.log.1', 'test.log.2'])
+
+        with open(path) as f:
+            self.assertTrue(f.read().endswith('line 29\n'))
+
+        sink = RotatingFileSink(path, max_bytes=100, backups=0)
+        sink.write(['é' * 40])
+        sink.write(['é' * 40])
+        sink.close()
+
+        self.assertLessEqual(os.path.getsize(path), 100, msg='max_bytes counts bytes')
+
+    def test_levels_by_name(self):
+        logger = Logger('Test', sinks=[])
+
+        self.assertEqual(logger.to_level('DEBUG|info, Warning'), DEBUG | INFO | WARNING)
+        self.assertEqual(logger.to_level(['ERROR', 'CRITICAL']), ERROR | CRITICAL)
+        self.assertRaises(Exception, logger.to_level, 'VERBOSE')
+
+    def test_lazy_formatting(self):
+        ring = RingBufferSink()
+        logger = Logger('Test', level='INFO', sinks=[ring])
+        calls = []
+
+        def expensive():
+            calls.append(1)
+            return 'expensive'
+
+        logger.debug('state', expensive)
+        self.assertEqual(calls, [])
+
+        logger.info('state %s %d', expensive, 2)
+        logger.info('100%', 'done')
+        self.assertEqual(calls, [1])
+        self.assertEqual(ring.dump(), ['Test:INFO state expensive 2', 'Test:INFO 100% done'])
+
+        logger.set_level(DEFAULT_LEVELS)
+        logger.debug('enabled')
+        self.assertEqual(ring.dump()[-1], 'Test:DEBUG enabled')
+
+    def test_spans(self):
+        timings = Spans()
+
+        for i in range(10):
+            with timings.span('loop'):
+                pass
+
+        @timings.timed('decorated')
+        def decorated(value):
+            return value * 2
+
+        timings.profile('decorated', every=2)
+
+        self.assertEqual([decorated(i) for i in range(4)], [0, 2, 4, 6])
+
+        report = timings.report()
+        self.assertEqual(report['loop']['count'], 10)
+        self.assertEqual(report['decorated']['count'], 4)
+        self.assertTrue(report['loop']['p50'] <= report['loop']['p95'] <= report['loop']['max'])
+        self.assertIn('decorated', timings.profiles)
+        self.assertIn('loop', timings.table())
+
+        logger = Logger('Test', sinks=[])
+
+        with logger.span('block'):
+            pass
+
+        self.assertIn('Test.block', spans.report())
+
+    def test_rate_limit(self):
+        now = [0]
+        ring = RingBufferSink()
+        limiter = RateLimiter(limit=2, period=1, max_keys=2, clock=lambda: now[0])
+        logger = Logger('Test', sinks=[ring], rate_limit=limiter)
+
+        for i in range(1000):
+            logger.error('flood')
+
+        self.assertEqual(ring.dump(clear=True), ['Test:ERROR flood', 'Test:ERROR flood'])
+        self.assertEqual(limiter.suppressed, 998)
+
+        now[0] = 1
+        logger.error('flood')
+
+        self.assertEqual(ring.dump(clear=True), [
+            'Test:ERROR flood [last message repeated 998 times]',
+            'Test:ERROR flood',
+        ])
+
+        for i in range(5):
+            logger.error('other')
+
+        logger.error('third')
+        logger.error('fourth')
+
+        self.assertEqual(len(limiter.recent), 2)
+        self.assertIn('Test:ERROR other [last message repeated 3 times]', ring.dump())
+
+        logger.error('fourth')
+        logger.error('fourth')
+        logger.flush()
+
+        self.assertEqual(ring.dump()[-1], 'Test:ERROR fourth [last message repeated 1 times]')
+
+    def test_rate_limit_skips_formatting(self):
+        ring = RingBufferSink()
+        logger = Logger('Test', sinks=[ring], rate_limit=RateLimiter(limit=1, period=60))
+        calls = []
+
+        def expensive():
+            calls.append(1)
+            return 'details'
+
+        for i in range(100):
+            logger.error('failed %s', expensive)
+
+        logger.flush()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(ring.dump(), [
+            'Test:ERROR failed details',
+            'Test:ERROR failed details [last message repeated 99 times]',
+        ])
+
+    def test_rate_limit_distinct_messages(self):
+        ring = RingBufferSink()
+        logger = Logger('Test', sinks=[ring], rate_limit=RateLimiter(limit=1, period=60))
+
+        for filename in ['a.js', 'b.js', 'c.js', 'd.js']:
+            logger.error('lint failed for %s', filename)
+            logger.error(ValueError(filename))
+
+        logger.flush()
+
+        self.assertEqual(len(ring.dump()), 8)
@@ -0,0 +1,104 @@
+import sublime
+import sys
+
+from sublime import Region
+
+from unittesting import DeferrableTestCase
+from unittest.mock import MagicMock
+
+from SublimeTools.Render import *
+from SublimeTools.View import RenderLocation
+
+
+version = sublime.version()
+
+views = []
+
+
+class TestRender(DeferrableTestCase):
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        yield 1000
+
+        for view in views:
+            window = view.window()
+
+            if window:
+                window.focus_view(view)
+                window.run_command('close_file')
+
+    def create_file(self, contents=''):
+        window = self.window = sublime.active_window()
+        self.view = window.new_file()
+        self.view.run_command('insert', { 'characters': contents })
+        self.view.set_scratch(True)
+        self.view.set_read_only(True)
+        views.append(self.view)
+
+    def test_LazyRenderer(self):
+        """ renders the visible region first, then the rest in the background """
+
+        lines = 2000
+
+        self.create_file(contents='why oh why\n' * lines)
+
+        locations = [{ 'start': { 'line': line, 'column': 0 }, 'end': { 'line': line, 'column': 3 } } for line in range(0, lines)]
+        locations.append({})
+
+        renderer = LazyRenderer(self.view, 'test_lazy', chunk_size=100, budget=1)
+        renderer.render(locations)
+
+        self.assertGreater(renderer.painted, 0)
+        self.assertLess(renderer.painted, lines, msg='only the visible region is painted at first')
+        self.assertEqual(self.view.get_regions('test_lazy.0')[0], Region(0, 3))
+
+        yield lambda: renderer.elapsed is not None
+
+        self.assertEqual(renderer.painted, lines)
+        self.assertEqual(renderer.skipped, 1)
+        self.assertEqual(renderer.progress(), 1.0)
+        self.assertEqual(sum(len(self.view.get_regions(key)) for key in renderer.keys), lines)
+
+        renderer.clear()
+
+        self.assertEqual(self.view.get_regions('test_lazy.0'), [])
+
+    def test_DiffRenderer(self):
+        """ only changed keys are rendered again """
+
+        self.create_file(contents='why oh why\noh whyyyyyyyyy')
+
+        view = self.view
+        view.add_regions = MagicMock(wraps=view.add_regions)
+        view.erase_regions = MagicMock(wraps=view.erase_regions)
+
+        errors = [{ 'position': { 'start': 0, 'end': 3 } }]
+        warnings = [{ 'start': { 'line': 1, 'column': 0 }, 'end': { 'line': 1, 'column': 2 } }]
+
+        renderer = DiffRenderer()
+        renderer.render(view, {
+            'test_errors': { 'locations': errors, 'scope': 'invalid' },
+            'test_warnings': { 'locations': warnings, 'scope': 'comment' },
+        })
+
+        self.assertEqual(view.add_regions.call_count, 2)
+        self.assertEqual(view.get_regions('test_warnings'), [Region(11, 13)])
+
+        renderer.render(view, {
+            'test_errors': { 'locations': [{ 'position': { 'start': 0, 'end': 3 } }], 'scope': 'invalid' },
+            'test_warnings': { 'locations': [RenderLocation(**warnings[0])], 'scope': 'comment' },
+        })
+
+        self.assertEqual(view.add_regions.call_count, 2, msg='identical results make no calls')
+        self.assertEqual(view.erase_regions.call_count, 0)
+
+        renderer.render(view, {
+            'test_errors': { 'locations': errors, 'scope': 'comment' },
+        })
+
+        self.assertEqual(view.add_regions.call_count, 3)
+        view.erase_regions.assert_called_once_with('test_warnings')
+        self.assertEqual(renderer.api_calls, 4)
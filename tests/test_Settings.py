@@ -4,7 +4,7 @@ import sys
 from unittesting import DeferrableTestCase
 from unittest.mock import MagicMock
 
-from SublimeTools.Settings import Settings
+from SublimeTools.Settings import MAX_SAVE_DELAY, Settings, SettingsFlushListener, SettingsResolver
 from SublimeTools.cuid import cuid
 
 
@@ -81,3 +81,273 @@ class TestSettings(DeferrableTestCase):
 
         self.assertTrue(settings.has(key))
         self.assertFalse(settings.has('lmao'))
+
+    def test_settings_snapshot(self):
+        """ Values are read from a snapshot until the settings change """
+
+        key = cuid()
+        self.write_settings({ key: { 'nested': [1, 2] } })
+
+        yield 500
+
+        settings = Settings(settings_name)
+
+        self.assertEqual(settings.get(key), { 'nested': [1, 2] })
+        settings.get(key)['nested'].append(3)
+        self.assertEqual(settings.get(key), { 'nested': [1, 2] }, msg='the snapshot hands out copies')
+        self.assertTrue(settings.has(key))
+
+        info = settings.cache_info()
+
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(info['hits'], 3)
+
+        self.write_settings({ key: 'changed' })
+
+        yield 500
+
+        self.assertEqual(settings.get(key), 'changed')
+
+    def test_settings_resolver(self):
+        """ Resolves keys through the view, package settings and defaults """
+
+        key = cuid()
+        platform_key = cuid()
+        self.write_settings({ key: 'package', platform_key: { sublime.platform(): 'package' } })
+
+        yield 500
+
+        view = sublime.active_window().new_file()
+        view.set_scratch(True)
+
+        resolver = SettingsResolver(
+            view=view,
+            settings=[Settings(settings_name)],
+            platform_keys=[platform_key, 'missing_platform'],
+            defaults={ 'default': 1, 'missing_platform': { 'nope': 1 } },
+        )
+
+        self.assertEqual(resolver.get(key), 'package')
+        self.assertEqual(resolver.get(platform_key), 'package')
+        self.assertEqual(resolver.get('default'), 1)
+        self.assertIsNone(resolver.get('missing_platform'))
+        self.assertEqual(resolver.get(cuid(), 123), 123)
+
+        rebuilds = resolver.rebuilds
+        resolver.get(key)
+        self.assertEqual(resolver.rebuilds, rebuilds, msg='resolved from the table')
+
+        view.settings().set(key, 'view')
+
+        yield 100
+
+        self.assertEqual(resolver.get(key), 'view')
+
+        resolver.close()
+        view.close()
+
+    def test_settings_path(self):
+        """ Gets and sets nested values by path """
+
+        key = cuid()
+        self.write_settings({ key: { 'eslint': { 'args': ['--fix'] } } })
+
+        yield 500
+
+        settings = Settings(settings_name)
+
+        self.assertEqual(settings.get_path(key + '.eslint.args.0'), '--fix')
+        self.assertEqual(settings.get_path([key, 'eslint', 'args']), ['--fix'])
+        self.assertEqual(settings.get_path(key + '.eslint.args.1', 'default'), 'default')
+        self.assertIsNone(settings.get_path(key + '.tsc.args'))
+
+        settings.set_path(key + '.eslint.args.1', '--cache')
+        settings.set_path(key + '.tsc.enabled', True)
+
+        self.assertEqual(settings.get(key), { 'eslint': { 'args': ['--fix', '--cache'] }, 'tsc': { 'enabled': True } })
+        self.assertRaises(Exception, lambda: settings.set_path(key + '.tsc.enabled.nope', 1))
+
+    def test_settings_snapshot_instances(self):
+        """ Every instance for the same path notices the settings changing """
+
+        key = cuid()
+        self.write_settings({ key: 1 })
+
+        yield 500
+
+        first = Settings(settings_name)
+        second = Settings(settings_name)
+
+        self.assertEqual(first.get(key), 1)
+        self.assertEqual(second.get(key), 1)
+
+        self.write_settings({ key: 2 })
+
+        yield 500
+
+        self.assertEqual(first.get(key), 2)
+        self.assertEqual(second.get(key), 2)
+
+    def test_settings_close(self):
+        """ closed instances stop following the settings """
+
+        key = cuid()
+        self.write_settings({ key: 1 })
+
+        yield 500
+
+        settings = Settings(settings_name)
+        on_key = MagicMock()
+        settings.watch(key, on_key)
+        settings.close()
+
+        self.write_settings({ key: 2 })
+
+        yield 500
+
+        on_key.assert_not_called()
+
+    def test_settings_change_events(self):
+        """ change events are only emitted for the keys that changed """
+
+        key = cuid()
+        other = cuid()
+        self.write_settings({ key: 1, other: 1 })
+
+        yield 500
+
+        settings = Settings(settings_name)
+        on_key = MagicMock()
+        on_other = MagicMock()
+        on_change = MagicMock()
+
+        settings.watch(key, on_key)
+        settings.watch(other, on_other)
+        settings.on('change', on_change)
+
+        self.write_settings({ key: 2, other: 1 })
+
+        yield 500
+
+        on_key.assert_called_once_with(2, 1)
+        on_other.assert_not_called()
+        on_change.assert_called_once_with([key])
+
+    def test_settings_set_emits_once(self):
+        """ set emits a single change event, however sublime calls on_change """
+
+        key = cuid()
+        self.write_settings({ key: 1 })
+
+        yield 500
+
+        settings = Settings(settings_name)
+        on_key = MagicMock()
+        settings.watch(key, on_key)
+
+        settings.set(key, 2)
+
+        yield 500
+
+        on_key.assert_called_once_with(2, 1)
+
+    def test_settings_change_events_instances(self):
+        """ change events are emitted by every instance for the same path """
+
+        key = cuid()
+        self.write_settings({ key: 1 })
+
+        yield 500
+
+        first = Settings(settings_name)
+        second = Settings(settings_name)
+        on_first = MagicMock()
+        on_second = MagicMock()
+
+        first.watch(key, on_first)
+        second.watch(key, on_second)
+
+        self.write_settings({ key: 2 })
+
+        yield 500
+
+        on_first.assert_called_once_with(2, 1)
+        on_second.assert_called_once_with(2, 1)
+
+    def test_settings_coalesced_saves(self):
+        """ Many sets are written with a single save """
+
+        settings = Settings(settings_name, save_delay=100)
+
+        for i in range(0, 10):
+            settings.set(cuid(), i)
+
+        self.assertEqual(settings.saves, 0)
+
+        yield 300
+
+        self.assertEqual(settings.saves, 1)
+        self.assertFalse(settings.dirty)
+
+        settings = Settings(settings_name, save_delay=60000)
+        settings.set(cuid(), 1)
+
+        self.assertEqual(settings.save_delay, MAX_SAVE_DELAY)
+
+        SettingsFlushListener().on_exit()
+
+        self.assertEqual(settings.saves, 1, msg='pending saves are flushed on exit')
+
+        settings = Settings(settings_name)
+
+        with settings.batch():
+            settings.set(cuid(), 1)
+            settings.set(cuid(), 2)
+
+            self.assertEqual(settings.saves, 0)
+
+        self.assertEqual(settings.saves, 1)
+
+    def test_settings_lazy(self):
+        """ Lazy settings are loaded when first used """
+
+        key = cuid()
+        self.write_settings({ key: 'lazy' })
+
+        yield 500
+
+        settings = Settings(settings_name, lazy=True)
+
+        self.assertIsNone(settings.loaded_settings)
+        self.assertEqual(settings.get(key), 'lazy')
+        self.assertIsInstance(settings.loaded_settings, sublime.Settings)
+
+        settings = Settings(settings_name, preload=True)
+
+        yield lambda: settings.loaded_settings is not None
+
+        self.assertEqual(settings.get(key), 'lazy')
+
+    def test_settings_startup_benchmark(self):
+        """ Creating lazy settings is cheaper than loading them eagerly """
+
+        import time
+
+        count = 50
+
+        def construct(**kwargs):
+            # Unique names, as sublime caches the settings it has loaded
+            names = ['SublimeToolsBenchmark{}.sublime-settings'.format(cuid()) for i in range(0, count)]
+            started = time.perf_counter()
+
+            for name in names:
+                Settings(name, **kwargs)
+
+            return time.perf_counter() - started
+
+        eager = construct()
+        lazy = construct(lazy=True)
+
+        print('\nSettings startup for {} files: eager {:.2f}ms, lazy {:.2f}ms'.format(count, eager * 1000, lazy * 1000))
+
+        self.assertLess(lazy, eager)
@@ -0,0 +1,119 @@
+import sublime
+import sys
+import json
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+version = sublime.version()
+
+from SublimeTools.Stream import JSONStreamParser, LocationStream, estree_location
+from SublimeTools.View import LocationTable, RenderLocation
+
+
+records = [
+    {
+        'start': 6,
+        'end': 9,
+        'loc': { 'start': { 'line': 1, 'column': 6 }, 'end': { 'line': 1, 'column': 9 } },
+        'message': 'Unexpected "}" or "]"',
+    },
+    {
+        'loc': { 'start': { 'line': 3, 'column': 0 }, 'end': { 'line': 4, 'column': 2 } },
+        'message': 'escaped \\" quote',
+    },
+]
+
+
+class TestStream(TestCase):
+
+    def test_parser_chunks(self):
+        """ records are parsed as soon as they complete, no matter how the stream is split """
+
+        data = json.dumps(records).encode('utf8')
+
+        for size in range(1, 20):
+            parser = JSONStreamParser()
+            parsed = []
+
+            for i in range(0, len(data), size):
+                parsed.extend(parser.feed(data[i:i + size]))
+
+            parsed.extend(parser.close())
+
+            self.assertEqual(parsed, records)
+
+        parser = JSONStreamParser()
+
+        self.assertEqual(parser.feed(data[:-20]), records[:1])
+
+    def test_parser_ndjson(self):
+        """ top level values are records when the stream isn't an array """
+
+        parser = JSONStreamParser()
+        data = '\n'.join(json.dumps(record) for record in records)
+
+        self.assertEqual(parser.feed(data) + parser.close(), records)
+
+    def test_parser_truncated(self):
+        parser = JSONStreamParser()
+        parser.feed(b'[{"start": 1')
+
+        self.assertRaises(Exception, parser.close)
+
+    def test_location_stream(self):
+        """ emits render locations as records complete """
+
+        on_location = MagicMock()
+        on_end = MagicMock()
+        stream = LocationStream()
+        stream.on('location', on_location)
+        stream.on('end', on_end)
+
+        data = json.dumps(records).encode('utf8')
+        locations = stream.feed(data[:-20])
+
+        self.assertEqual(len(locations), 1)
+        self.assertIsInstance(locations[0], RenderLocation)
+        self.assertEqual(locations[0].pos.begin(), 6)
+        self.assertEqual(locations[0].to_json()['start'], { 'line': 0, 'column': 6 })
+        on_location.assert_called_once_with(locations[0], records[0])
+
+        locations = stream.feed(data[-20:]) + stream.close()
+
+        self.assertEqual(locations[0].to_json()['end'], { 'line': 3, 'column': 2 })
+        on_end.assert_called_once_with(2)
+
+    def test_location_stream_table(self):
+        table = LocationTable()
+        stream = LocationStream(table=table)
+
+        stream.feed(json.dumps(records))
+        stream.close()
+
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table[0].to_json(), RenderLocation(**estree_location(records[0])).to_json())
+
+    def test_parser_noise(self):
+        """ text around the JSON, like stderr warnings, is skipped """
+
+        data = (
+            '(node:1) Warning: [DEP0005] Buffer() is deprecated\n' +
+            json.dumps(records) +
+            '\nDone in 1.2s\n'
+        ).encode('utf8')
+
+        for size in (1, 7, len(data)):
+            parser = JSONStreamParser()
+            parsed = []
+
+            for i in range(0, len(data), size):
+                parsed.extend(parser.feed(data[i:i + size]))
+
+            self.assertEqual(parsed + parser.close(), records)
+
+        parser = JSONStreamParser()
+        parsed = parser.feed('{"a": 1}\n{not json}\n{"b": 2}\n')
+
+        self.assertEqual(parsed, [{ 'a': 1 }, { 'b': 2 }])
+        self.assertEqual(parser.errors, 1)
@@ -193,3 +193,267 @@ class TestExec(DeferrableTestCase):
 
         self.assertIsNone(RenderLocation().start_point(self.view))
         self.assertIsNone(RenderLocation().end_point(self.view))
+
+    def test_LineIndex(self):
+        contents = 'roflsandlawls\n\nsaxandviolins\n'
+
+        self.create_file(contents=contents)
+        index = get_line_index(self.view)
+
+        self.assertIs(get_line_index(self.view), index, msg='cached until the view changes')
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.size(), len(contents))
+
+        for line in range(0, 5):
+            for column in range(0, 20):
+                self.assertEqual(index.text_point(line, column), self.view.text_point(line, column))
+
+        for point in range(0, len(contents) + 1):
+            self.assertEqual(index.rowcol(point), self.view.rowcol(point))
+
+        self.assertEqual(SimpleLocation(2, 3).to_point(index), 18)
+        self.assertEqual(
+            RenderLocation(start={ 'line': 0, 'column': 4 }, end={ 'line': 2, 'column': 1 }).to_region(index),
+            Region(4, 16)
+        )
+
+    def test_locations_to_regions(self):
+        contents = 'why oh why\noh whyyyyyyyyy'
+
+        self.create_file(contents=contents)
+
+        locations = [
+            { 'position': { 'start': 2, 'end': 4 } },
+            { 'position': { 'start': 3 } },
+            { 'start': { 'line': 1, 'column': 0 }, 'end': { 'line': 1, 'column': 2 } },
+            { 'position': { 'start': 1 }, 'end': { 'line': 1, 'column': 3 } },
+            None,
+            {},
+        ]
+
+        for invalid in invalid_points:
+            locations.append({ 'position': { 'start': invalid, 'end': 3 } })
+            locations.append({ 'start': { 'line': invalid, 'column': 0 }, 'end': { 'line': 0, 'column': 1 } })
+
+        expected = [RenderLocation(**location).to_region(self.view) for location in locations if location is not None]
+
+        self.assertEqual(
+            locations_to_regions(self.view, locations),
+            [region for region in expected if region is not None]
+        )
+
+        begins, ends, indexes = locations_to_points(self.view, locations)
+
+        self.assertEqual(list(begins), [2, 3, 11, 1])
+        self.assertEqual(list(ends), [4, 3, 13, 1])
+        self.assertEqual(list(indexes), [0, 1, 2, 3])
+
+    def test_LocationTable(self):
+        contents = 'why oh why\noh whyyyyyyyyy'
+
+        self.create_file(contents=contents)
+
+        locations = [
+            { 'position': { 'start': 2, 'end': 4 } },
+            { 'start': { 'line': 1, 'column': 0 }, 'end': { 'line': 1, 'column': 2 } },
+            { 'position': { 'start': 1 }, 'end': { 'line': 1, 'column': 3 } },
+            { 'start': { 'line': -1, 'column': 0 } },
+            {},
+        ]
+
+        table = LocationTable(locations)
+
+        self.assertEqual(len(table), len(locations))
+
+        for location, row in zip(locations, table):
+            expected = RenderLocation(**location)
+
+            self.assertEqual(row.to_region(self.view), expected.to_region(self.view))
+            self.assertEqual(row.to_json(), expected.to_json())
+            self.assertEqual(row.render_ability(), expected.render_ability())
+            self.assertEqual(row.start_line(self.view), expected.start_line(self.view))
+            self.assertEqual(row.end_point(self.view), expected.end_point(self.view))
+
+        self.assertEqual(table.to_regions(self.view), [Region(2, 4), Region(11, 13), Region(1, 1)])
+        self.assertEqual(table[-1].row, 4)
+        self.assertRaises(IndexError, lambda: table[5])
+
+        self.assertRaises(AttributeError, lambda: setattr(Position(0), 'c', 1), msg='slotted')
+
+    def test_view_registry(self):
+        self.create_file()
+
+        self.assertEqual(get_views_by_ids(self.view.id()), [self.view])
+        self.assertEqual(get_views_by_ids([self.view.id(), -1]), [self.view])
+        self.assertIs(view_registry.by_id.get(self.view.id()), self.view)
+
+        resyncs = view_registry.resyncs
+
+        self.assertEqual(get_views_by_ids([self.view.id()]), [self.view])
+        self.assertEqual(view_registry.resyncs, resyncs, msg='lookups do not walk the windows')
+
+        view_registry.remove(self.view.id())
+        view_registry.synced_at = 0
+
+        self.assertEqual(get_views_by_ids([self.view.id()]), [self.view], msg='resyncs on a stale miss')
+
+    def test_view_registry_loading(self):
+        """ views that are still loading are found by file name """
+
+        import os
+        import tempfile
+
+        fd, file_name = tempfile.mkstemp(suffix='.txt')
+        os.close(fd)
+
+        view_registry.resync()
+
+        view = sublime.active_window().open_file(file_name)
+        views.append(view)
+
+        self.assertEqual(get_views_by_file_names(file_name), [view])
+        self.assertIs(view_registry.by_id.get(view.id()), view)
+
+        yield 500
+
+        os.remove(file_name)
+
+    def test_LocationIndex(self):
+        contents = 'why oh why\noh whyyyyyyyyy'
+
+        self.create_file(contents=contents)
+
+        locations = [
+            { 'position': { 'start': 7, 'end': 10 } },
+            { 'position': { 'start': 0, 'end': 3 } },
+            { 'start': { 'line': 1, 'column': 0 }, 'end': { 'line': 1, 'column': 2 } },
+            { 'position': { 'start': 2, 'end': 8 } },
+        ]
+
+        index = LocationIndex.from_locations(self.view, locations)
+
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.overlapping(2), [(Region(0, 3), locations[1]), (Region(2, 8), locations[3])])
+        self.assertEqual([region for region, _ in index.overlapping(8, 11)], [Region(2, 8), Region(7, 10), Region(11, 13)])
+        self.assertEqual(index.overlapping(14), [])
+
+        self.assertEqual(index.next(2), (Region(7, 10), locations[0]))
+        self.assertEqual(index.previous(7), (Region(2, 8), locations[3]))
+        self.assertIsNone(index.next(11))
+        self.assertEqual(index.next(11, wrap=True), (Region(0, 3), locations[1]))
+        self.assertIsNone(index.previous(0))
+
+        # Replace "oh" at 4 with "ohhh"
+        index.apply_change(4, 2, 4)
+
+        self.assertEqual(
+            [index.region(i) for i in range(0, len(index))],
+            [Region(0, 3), Region(2, 10), Region(9, 12), Region(13, 15)]
+        )
+        self.assertEqual(index.overlapping(11), [(Region(9, 12), locations[0])])
+
+        # Remove "why\noh" at 9
+        index.apply_change(9, 6, 0)
+
+        self.assertEqual(
+            [index.region(i) for i in range(0, len(index))],
+            [Region(0, 3), Region(2, 9), Region(9, 9), Region(9, 9)]
+        )
+
+    def test_OffsetTable(self):
+        contents = 'a\U0001F600b\u00e9\n\U0001F600c'
+
+        self.create_file(contents=contents)
+
+        utf16 = get_offset_table(self.view, 'utf-16')
+        utf8 = get_offset_table(self.view, 'utf-8')
+
+        self.assertIs(get_offset_table(self.view, 'utf-16'), utf16)
+        self.assertEqual(utf16.encoded_length, len(contents.encode('utf-16-le')) // 2)
+        self.assertEqual(utf8.encoded_length, len(contents.encode('utf-8')))
+
+        for point in range(0, len(contents) + 1):
+            self.assertEqual(utf16.to_offset(point), len(contents[:point].encode('utf-16-le')) // 2)
+            self.assertEqual(utf8.to_offset(point), len(contents[:point].encode('utf-8')))
+            self.assertEqual(utf16.to_point(utf16.to_offset(point)), point)
+            self.assertEqual(utf8.to_point(utf8.to_offset(point)), point)
+
+        self.assertEqual(utf16.to_point(2), 1, msg='within a surrogate pair')
+        self.assertEqual(utf16.to_points([0, 3, 7, 8]), [0, 2, 5, 6])
+        self.assertEqual(utf16.to_points([8, 0, 7, 3]), [6, 0, 5, 2])
+
+        self.assertEqual(
+            translate_positions(self.view, [Position(3, 7), Position(8), Position(None, 3)]),
+            [(2, 5), (6, 6), (None, 2)]
+        )
+
+    def test_scope_cache(self):
+        self.create_file(contents='why oh why')
+
+        view = self.view
+        view.assign_syntax('Packages/Python/Python.sublime-syntax')
+
+        self.assertEqual(get_source_scope(view), 'source.python')
+
+        view.scope_name = MagicMock(wraps=view.scope_name)
+        view.match_selector = MagicMock(wraps=view.match_selector)
+
+        self.assertEqual(scope_names(view, [0, 1]), [sublime.View.scope_name(view, 0), sublime.View.scope_name(view, 1)])
+        self.assertEqual(match_selectors(view, [0, 1], 'source.python'), [True, True])
+
+        calls = view.scope_name.call_count + view.match_selector.call_count
+
+        get_source_scope(view)
+        scope_names(view, [0, 1])
+        match_selectors(view, [0, 1], 'source.python')
+
+        self.assertEqual(view.scope_name.call_count + view.match_selector.call_count, calls, msg='cached')
+
+        view.run_command('insert', { 'characters': '\n' })
+
+        self.assertEqual(scope_names(view, [0]), [sublime.View.scope_name(view, 0)])
+        self.assertEqual(view.scope_name.call_count + view.match_selector.call_count, calls + 1, msg='refetched')
+
+        view.assign_syntax('Packages/Text/Plain text.tmLanguage')
+
+        self.assertEqual(get_source_scope(view), 'text.plain')
+
+    def test_location_equality(self):
+        self.assertEqual(Position(1, 2), Position(1, 2))
+        self.assertNotEqual(Position(1, 2), Position(1, 3))
+        self.assertEqual(hash(Position(1, 2)), hash((1, 2)))
+        self.assertEqual(SimpleLocation(1, 2), SimpleLocation(1, 2))
+        self.assertNotEqual(SimpleLocation(1, 2), (1, 2))
+
+        first = RenderLocation(position={ 'start': 1, 'end': 2 }, start={ 'line': 0, 'column': 1 })
+        second = RenderLocation(position={ 'start': 1, 'end': 2 }, start={ 'line': 0, 'column': 1 })
+
+        self.assertEqual(first, second)
+        self.assertEqual(len({ first, second, RenderLocation() }), 2)
+        self.assertEqual(dedupe_locations([first, RenderLocation(), second]), [first, RenderLocation()])
+
+    def test_merge_locations(self):
+        self.create_file(contents='why oh why\noh whyyyyyyyyy')
+
+        merged = merge_locations(self.view, [
+            ({ 'position': { 'start': 0, 'end': 4 } }, 'invalid', 'eslint'),
+            ({ 'position': { 'start': 2, 'end': 6 } }, 'invalid', 'flow'),
+            ({ 'position': { 'start': 6, 'end': 8 } }, 'invalid', 'flow'),
+            ({ 'position': { 'start': 0, 'end': 4 } }, 'comment', 'eslint'),
+            (RenderLocation(start={ 'line': 1, 'column': 0 }, end={ 'line': 1, 'column': 2 }), 'comment', 'tsc'),
+            ({ 'start': { 'line': 1, 'column': 0 }, 'end': { 'line': 1, 'column': 2 } }, 'comment', 'eslint'),
+            ({}, 'comment', 'eslint'),
+        ])
+
+        self.assertEqual(merged, [
+            (Region(0, 4), 'comment', ['eslint']),
+            (Region(11, 13), 'comment', ['tsc', 'eslint']),
+            (Region(0, 8), 'invalid', ['eslint', 'flow']),
+        ])
+
+        merged = merge_locations(self.view, [
+            ({ 'position': { 'start': 0, 'end': 4 } }, 'invalid', 'eslint'),
+            ({ 'position': { 'start': 4, 'end': 6 } }, 'invalid', 'flow'),
+        ], adjacent=False)
+
+        self.assertEqual([region for region, _, _ in merged], [Region(0, 4), Region(4, 6)])
@@ -0,0 +1,113 @@
+import os
+import re
+import signal
+import sublime
+import threading
+import time
+
+from unittest import TestCase, skipUnless
+
+version = sublime.version()
+
+from SublimeTools.cuid import CuidGenerator, cuid_batch, get_process_fingerprint
+
+
+class TestCuid(TestCase):
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_cuid_batch(self):
+        generator = CuidGenerator()
+        single = generator.cuid()
+        identifiers = generator.cuid_batch(1000)
+
+        self.assertEqual(len(set(identifiers)), 1000)
+        self.assertEqual(len(cuid_batch(3)), 3)
+
+        for identifier in identifiers:
+            self.assertTrue(re.match(r'^c[0-9a-z]{24}$', identifier), identifier)
+            self.assertEqual(len(identifier), len(single))
+            self.assertEqual(identifier[-12:-8], generator.fingerprint)
+
+        counters = [int(identifier[-16:-12], 36) for identifier in identifiers]
+        self.assertEqual(counters, list(range(counters[0], counters[0] + 1000)))
+
+    def test_cuid_batch_benchmark(self):
+        n = 20000
+        generator = CuidGenerator()
+
+        start = time.perf_counter()
+        for i in range(n):
+            generator.cuid()
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        generator.cuid_batch(n)
+        batch = time.perf_counter() - start
+
+        print('cuid: {:.0f} ids/s, cuid_batch: {:.0f} ids/s'.format(n / single, n / batch))
+
+    def test_threads(self):
+        generator = CuidGenerator()
+        results = []
+
+        def generate():
+            results.append([generator.counter for i in range(1000)])
+
+        threads = [threading.Thread(target=generate) for i in range(8)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        counters = [counter for result in results for counter in result]
+        self.assertEqual(len(set(counters)), len(counters))
+
+    @skipUnless(hasattr(os, 'fork'), 'os.fork is not available')
+    def test_fork(self):
+        generator = CuidGenerator()
+        parent = generator.fingerprint
+        read, write = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            os.close(read)
+            os.write(write, (generator.fingerprint + get_process_fingerprint()).encode())
+            os._exit(0)
+
+        os.close(write)
+        child = os.read(read, 100).decode()
+        os.close(read)
+        os.waitpid(pid, 0)
+
+        self.assertEqual(child[:4], child[4:])
+        self.assertNotEqual(child[:4], parent)
+
+    @skipUnless(hasattr(os, 'fork'), 'os.fork is not available')
+    def test_fork_with_lock_held(self):
+        generator = CuidGenerator()
+        read, write = os.pipe()
+
+        # As if another thread was reserving counter values while forking
+        with generator._lock:
+            pid = os.fork()
+
+            if pid == 0:
+                # Don't hang the test run if the child deadlocks
+                signal.alarm(5)
+                os.close(read)
+                os.write(write, generator.cuid().encode())
+                os._exit(0)
+
+        os.close(write)
+        child = os.read(read, 100).decode()
+        os.close(read)
+        os.waitpid(pid, 0)
+
+        self.assertTrue(re.match(r'^c[0-9a-z]{24}$', child), child)